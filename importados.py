@@ -1,7 +1,20 @@
 
 import pandas as pd
 import os
+import json
+import re
+import math
+import unicodedata
+import hashlib
+import html
+from urllib.parse import quote
+import time
+import sqlite3
 import shutil
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
 
 import subprocess
 
@@ -11,15 +24,1121 @@ PRODUCTS_FILE = 'products.csv'
 AVAILABLE_FILE = 'available.csv'
 SOLD_FILE = 'sold.csv'
 
-# File paths and GitHub repository info
-GITHUB_PUBLIC_REPO = "https://github.com/mica-92/fily.git"
-GITHUB_PRIVATE_REPO = "https://github.com/mica-92/fily_private.git"
+# Per-size stock: one compact (ID, Sizes, Count) row per size. The product attributes live
+# only in products.csv and are joined in when a view needs them; available.csv is kept as
+# the joined export (and the source stock.csv is created from the first time)
+STOCK_FILE = 'stock.csv'
+PRODUCT_ATTRIBUTES = ['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Trip #']
+AVAILABLE_COLUMNS = PRODUCT_ATTRIBUTES + ['Sizes', 'Count']
+
+# Sales journal: every sale is appended here and folded into the snapshot
+# files (stock.csv / sold.csv) once COMPACT_EVERY records have piled up
+JOURNAL_FILE = 'journal.jsonl'
+COMPACT_MARKER = 'journal.compact'
+# Held while appending to the journal or folding it into the snapshots, so no other process's sale is lost
+JOURNAL_LOCK = 'journal.lock'
+COMPACT_EVERY = 50
+
+# Sales archive: the sales snapshot split into one file per month of Selling Date, with typed dates,
+# plus a manifest of each month's first and last date so a period query only opens the months it overlaps
+SALES_ARCHIVE_DIR = 'sales'
+SALES_ARCHIVE_MANIFEST = os.path.join(SALES_ARCHIVE_DIR, 'manifest.json')
+
+# Next-ID counters per prefix (e.g. {"SJ": 9, "TN": 5}); rebuilt from products.csv if missing
+ID_COUNTERS_FILE = 'id_counters.json'
+ID_COUNTERS_LOCK = 'id_counters.lock'
+
+# Per-trip totals, kept up to date by every write to products and sales (rebuilt only if a table changed outside the program)
+TRIP_TOTALS_FILE = 'trip_totals.json'
+TRIP_TOTAL_COLUMNS = ['Gross_Cost', 'Expected_Selling_Price', 'Number_of_Products', 'Realized_Revenue', 'Units_Sold']
+# Rows behind each trip's totals; a trip with neither products nor sales left is dropped
+TRIP_ROW_COLUMNS = ['Product_Rows', 'Sale_Rows']
+
+# Storage backend for the three tables: 'csv' (default), 'parquet' / 'feather' (need pyarrow) or 'sqlite'.
+# The other backends are created from the CSVs on first use (products.parquet, ... or fily.db);
+# the CSVs then stay as an export format (see export_tables_csv)
+STORAGE_FORMAT = os.environ.get('FILY_STORAGE', 'csv').lower()
+COLUMNAR_FORMATS = ('parquet', 'feather')
+if STORAGE_FORMAT in COLUMNAR_FORMATS:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print(f"pyarrow is not installed; using CSV storage instead of {STORAGE_FORMAT}.")
+        STORAGE_FORMAT = 'csv'
+
+# Pillow is only needed for the resized product photos; without it the cards use the originals
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:
+    PILImage = None
+
+# Fixed column types for the columnar backend (low-cardinality text columns are categoricals)
+COLUMN_TYPES = {
+    'ID': 'string',
+    'Type': 'category',
+    'Gender': 'category',
+    'Brand': 'category',
+    'Name': 'string',
+    'Color': 'string',
+    'Cost (USD)': 'float64',
+    'Expected Price (USD)': 'float64',
+    'Trip #': 'category',
+    'Sizes': 'string',
+    'Count': 'Int64',
+    'Selling Date': 'datetime64[ns]',
+    'Final Price': 'float64',
+    'Customer': 'string',
+    'Notes': 'string',
+    'Size Sold': 'string',
+}
+
+# SQLite backend: one database with indexed products, per-size stock and sales tables
+DATABASE_FILE = 'fily.db'
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    "ID" TEXT, "Type" TEXT, "Gender" TEXT, "Brand" TEXT, "Name" TEXT, "Color" TEXT,
+    "Cost (USD)" REAL, "Expected Price (USD)" REAL, "Trip #" TEXT, "Sizes" TEXT, "Count" INTEGER
+);
+CREATE INDEX IF NOT EXISTS products_id ON products ("ID");
+
+CREATE TABLE IF NOT EXISTS stock (
+    "ID" TEXT, "Sizes" TEXT, "Count" INTEGER
+);
+CREATE INDEX IF NOT EXISTS stock_id_size ON stock ("ID", "Sizes");
+
+CREATE TABLE IF NOT EXISTS sold (
+    "ID" TEXT, "Type" TEXT, "Gender" TEXT, "Brand" TEXT, "Name" TEXT, "Color" TEXT,
+    "Cost (USD)" REAL, "Expected Price (USD)" REAL, "Trip #" TEXT, "Sizes" TEXT, "Count" INTEGER,
+    "Selling Date" TEXT, "Final Price" REAL, "Customer" TEXT, "Notes" TEXT, "Size Sold" TEXT
+);
+CREATE INDEX IF NOT EXISTS sold_id ON sold ("ID");
+CREATE INDEX IF NOT EXISTS sold_date ON sold ("Selling Date");
+
+CREATE TABLE IF NOT EXISTS trip_totals (
+    "Trip #" TEXT PRIMARY KEY, "Gross_Cost" REAL, "Expected_Selling_Price" REAL, "Number_of_Products" REAL,
+    "Realized_Revenue" REAL, "Units_Sold" INTEGER, "Product_Rows" INTEGER, "Sale_Rows" INTEGER
+);
+
+CREATE TRIGGER IF NOT EXISTS products_trip_insert AFTER INSERT ON products BEGIN
+    INSERT INTO trip_totals
+    SELECT NEW."Trip #", COALESCE(NEW."Cost (USD)", 0) * COALESCE(NEW."Count", 0),
+           COALESCE(NEW."Expected Price (USD)", 0) * COALESCE(NEW."Count", 0), COALESCE(NEW."Count", 0), 0, 0, 1, 0
+    WHERE NEW."Trip #" IS NOT NULL
+    ON CONFLICT ("Trip #") DO UPDATE SET
+        "Gross_Cost" = "Gross_Cost" + excluded."Gross_Cost",
+        "Expected_Selling_Price" = "Expected_Selling_Price" + excluded."Expected_Selling_Price",
+        "Number_of_Products" = "Number_of_Products" + excluded."Number_of_Products",
+        "Product_Rows" = "Product_Rows" + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_trip_delete AFTER DELETE ON products BEGIN
+    UPDATE trip_totals SET
+        "Gross_Cost" = "Gross_Cost" - COALESCE(OLD."Cost (USD)", 0) * COALESCE(OLD."Count", 0),
+        "Expected_Selling_Price" = "Expected_Selling_Price" - COALESCE(OLD."Expected Price (USD)", 0) * COALESCE(OLD."Count", 0),
+        "Number_of_Products" = "Number_of_Products" - COALESCE(OLD."Count", 0),
+        "Product_Rows" = "Product_Rows" - 1
+    WHERE "Trip #" = OLD."Trip #";
+    DELETE FROM trip_totals WHERE "Trip #" = OLD."Trip #" AND "Product_Rows" = 0 AND "Sale_Rows" = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_trip_update AFTER UPDATE ON products BEGIN
+    UPDATE trip_totals SET
+        "Gross_Cost" = "Gross_Cost" - COALESCE(OLD."Cost (USD)", 0) * COALESCE(OLD."Count", 0),
+        "Expected_Selling_Price" = "Expected_Selling_Price" - COALESCE(OLD."Expected Price (USD)", 0) * COALESCE(OLD."Count", 0),
+        "Number_of_Products" = "Number_of_Products" - COALESCE(OLD."Count", 0),
+        "Product_Rows" = "Product_Rows" - 1
+    WHERE "Trip #" = OLD."Trip #";
+    DELETE FROM trip_totals WHERE "Trip #" = OLD."Trip #" AND "Product_Rows" = 0 AND "Sale_Rows" = 0;
+    INSERT INTO trip_totals
+    SELECT NEW."Trip #", COALESCE(NEW."Cost (USD)", 0) * COALESCE(NEW."Count", 0),
+           COALESCE(NEW."Expected Price (USD)", 0) * COALESCE(NEW."Count", 0), COALESCE(NEW."Count", 0), 0, 0, 1, 0
+    WHERE NEW."Trip #" IS NOT NULL
+    ON CONFLICT ("Trip #") DO UPDATE SET
+        "Gross_Cost" = "Gross_Cost" + excluded."Gross_Cost",
+        "Expected_Selling_Price" = "Expected_Selling_Price" + excluded."Expected_Selling_Price",
+        "Number_of_Products" = "Number_of_Products" + excluded."Number_of_Products",
+        "Product_Rows" = "Product_Rows" + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sold_trip_insert AFTER INSERT ON sold BEGIN
+    INSERT INTO trip_totals
+    SELECT NEW."Trip #", 0, 0, 0, COALESCE(NEW."Final Price", 0), 1, 0, 1
+    WHERE NEW."Trip #" IS NOT NULL
+    ON CONFLICT ("Trip #") DO UPDATE SET
+        "Realized_Revenue" = "Realized_Revenue" + excluded."Realized_Revenue",
+        "Units_Sold" = "Units_Sold" + 1,
+        "Sale_Rows" = "Sale_Rows" + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sold_trip_delete AFTER DELETE ON sold BEGIN
+    UPDATE trip_totals SET
+        "Realized_Revenue" = "Realized_Revenue" - COALESCE(OLD."Final Price", 0),
+        "Units_Sold" = "Units_Sold" - 1,
+        "Sale_Rows" = "Sale_Rows" - 1
+    WHERE "Trip #" = OLD."Trip #";
+    DELETE FROM trip_totals WHERE "Trip #" = OLD."Trip #" AND "Product_Rows" = 0 AND "Sale_Rows" = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sold_trip_update AFTER UPDATE ON sold BEGIN
+    UPDATE trip_totals SET
+        "Realized_Revenue" = "Realized_Revenue" - COALESCE(OLD."Final Price", 0),
+        "Units_Sold" = "Units_Sold" - 1,
+        "Sale_Rows" = "Sale_Rows" - 1
+    WHERE "Trip #" = OLD."Trip #";
+    DELETE FROM trip_totals WHERE "Trip #" = OLD."Trip #" AND "Product_Rows" = 0 AND "Sale_Rows" = 0;
+    INSERT INTO trip_totals
+    SELECT NEW."Trip #", 0, 0, 0, COALESCE(NEW."Final Price", 0), 1, 0, 1
+    WHERE NEW."Trip #" IS NOT NULL
+    ON CONFLICT ("Trip #") DO UPDATE SET
+        "Realized_Revenue" = "Realized_Revenue" + excluded."Realized_Revenue",
+        "Units_Sold" = "Units_Sold" + 1,
+        "Sale_Rows" = "Sale_Rows" + 1;
+END;
+"""
+
+# Fills trip_totals for a database created before the table existed (from then on the triggers keep it current)
+SQLITE_TRIP_TOTALS_BACKFILL = """
+INSERT INTO trip_totals
+SELECT "Trip #", SUM(gross_cost), SUM(expected_price), SUM(units), SUM(revenue), SUM(units_sold), SUM(product_rows), SUM(sale_rows)
+FROM (
+    SELECT "Trip #", COALESCE("Cost (USD)", 0) * COALESCE("Count", 0) AS gross_cost,
+           COALESCE("Expected Price (USD)", 0) * COALESCE("Count", 0) AS expected_price, COALESCE("Count", 0) AS units,
+           0 AS revenue, 0 AS units_sold, 1 AS product_rows, 0 AS sale_rows
+    FROM products
+    UNION ALL
+    SELECT "Trip #", 0, 0, 0, COALESCE("Final Price", 0), 1, 0, 1 FROM sold
+)
+WHERE "Trip #" IS NOT NULL
+GROUP BY "Trip #"
+"""
+
+# File paths and GitHub repository info (FILY_PUBLIC_REPO / FILY_PRIVATE_REPO point them elsewhere, e.g. a local bare repo)
+GITHUB_PUBLIC_REPO = os.environ.get('FILY_PUBLIC_REPO', "https://github.com/mica-92/fily.git")
+GITHUB_PRIVATE_REPO = os.environ.get('FILY_PRIVATE_REPO', "https://github.com/mica-92/fily_private.git")
+PUBLISH_BRANCH = 'main'
+
+
+# Function to give the file a table is stored in for the current backend (products.csv -> products.parquet)
+def table_file(csv_path):
+    if STORAGE_FORMAT not in COLUMNAR_FORMATS:
+        return csv_path
+    return f"{os.path.splitext(csv_path)[0]}.{STORAGE_FORMAT}"
+
+# Function to cast a table to the fixed column types
+def apply_schema(df):
+    df = df.copy()
+    for column, dtype in COLUMN_TYPES.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'category':
+            df[column] = df[column].astype('string').astype('category')
+        elif dtype.startswith('datetime'):
+            # Every row is read on its own ('2024-10-5', '10/28/2024', ...); if one can't be read at all
+            # the column stays text (ISO where readable) instead of turning that date into NaT
+            dates = parse_selling_dates(df[column])
+            typed = df[column].astype('string').str.strip().fillna('') != ''
+            if (dates.isna() & typed).any():
+                df[column] = iso_selling_dates(df[column]).astype('string')
+            else:
+                df[column] = dates
+        elif dtype in ('float64', 'Int64'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+# Function to read one table from the current backend
+def read_table(csv_path):
+    if STORAGE_FORMAT not in COLUMNAR_FORMATS:
+        return pd.read_csv(csv_path)
+
+    path = table_file(csv_path)
+    if not os.path.exists(path):
+        # First run on the columnar backend: convert the existing CSV once
+        write_table(pd.read_csv(csv_path), csv_path)
+    if STORAGE_FORMAT == 'feather':
+        return apply_schema(pd.read_feather(path))
+    return apply_schema(pd.read_parquet(path))
+
+# Function to write one table to the current backend (to `path` if given, e.g. a temporary file)
+def write_table(df, csv_path, path=None):
+    path = path or table_file(csv_path)
+    if STORAGE_FORMAT not in COLUMNAR_FORMATS:
+        df.to_csv(path, index=False)
+    elif STORAGE_FORMAT == 'feather':
+        apply_schema(df).reset_index(drop=True).to_feather(path)
+    else:
+        apply_schema(df).to_parquet(path, index=False)
+
+# Function to read hand-typed Selling Dates ('2024-10-5', '2024-10-31 15:00', ...) as days (NaT when unreadable)
+def parse_selling_dates(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), format='mixed', errors='coerce').dt.normalize()
+
+# Function to write Selling Dates as ISO YYYY-MM-DD text (unreadable ones are kept as typed)
+def iso_selling_dates(values):
+    values = pd.Series(values, dtype=object)
+    return parse_selling_dates(values).dt.strftime('%Y-%m-%d').astype(object).where(lambda dates: dates.notna(), values)
+
+# Function to turn values pandas hands out (numpy scalars, timestamps, missing values) into JSON
+def json_default(value):
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value.item()
+
+# Function to hold the journal lock; taking it again inside the same process does not wait for itself
+journal_lock_depth = 0
+
+@contextmanager
+def journal_lock():
+    global journal_lock_depth
+    if journal_lock_depth:
+        journal_lock_depth += 1
+        try:
+            yield
+        finally:
+            journal_lock_depth -= 1
+        return
+    with file_lock(JOURNAL_LOCK):
+        journal_lock_depth = 1
+        try:
+            yield
+        finally:
+            journal_lock_depth = 0
+
+# Function to append records to the sales journal
+def append_journal(records):
+    """Append records to the journal in one write; the cost does not depend on the size of sold.csv."""
+    with journal_lock(), open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(record, ensure_ascii=False, default=json_default) + "\n" for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+
+# Function to read the pending journal records
+def read_journal():
+    if not os.path.exists(JOURNAL_FILE):
+        return []
+    records = []
+    with open(JOURNAL_FILE, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # A torn last line from a crash mid-append is ignored
+    return records
+
+# Function to replay journal records on top of the snapshot files
+def apply_journal(stock_df, sold_df, records):
+    sales = [record['sale'] for record in records if record.get('op') == 'sale']
+    if not sales:
+        return stock_df, sold_df
+
+    # Decrement the stock once per (ID, size) with the number of units sold
+    if stock_df is not None:
+        sold_counts = pd.DataFrame(sales).groupby(['ID', 'Size Sold']).size()
+        stock_df = stock_df.copy()
+        keys = pd.MultiIndex.from_arrays([stock_df['ID'], stock_df['Sizes'].astype(str)])
+        stock_df['Count'] = stock_df['Count'] - sold_counts.reindex(keys, fill_value=0).values
+        stock_df = stock_df[stock_df['Count'] > 0]
+
+    if sold_df is not None:
+        sold_df = pd.concat([sold_df, pd.DataFrame(sales)], ignore_index=True)
+    return stock_df, sold_df
+
+# Function to create stock.csv from the denormalized available.csv (done once)
+def migrate_available_to_stock():
+    if os.path.exists(AVAILABLE_FILE) or os.path.exists(table_file(AVAILABLE_FILE)):
+        stock_df = read_table(AVAILABLE_FILE)[['ID', 'Sizes', 'Count']]
+    else:
+        stock_df = pd.DataFrame(columns=['ID', 'Sizes', 'Count'])
+    write_table(stock_df, STOCK_FILE)
+
+# Function to load the per-size stock (snapshot plus pending sales)
+def load_stock():
+    if not os.path.exists(STOCK_FILE) and not os.path.exists(table_file(STOCK_FILE)):
+        migrate_available_to_stock()
+    stock_df = read_table(STOCK_FILE)
+    records = read_journal()
+    if records:
+        stock_df, _ = apply_journal(stock_df, None, records)
+    return stock_df
+
+# Function to join the stock with the product attributes (the rows of available.csv)
+def join_stock(stock_df, products_df):
+    attributes = products_df[PRODUCT_ATTRIBUTES].drop_duplicates('ID')
+    available_df = stock_df[['ID', 'Sizes', 'Count']].merge(attributes, on='ID', how='left')
+    available_df.index = stock_df.index  # Keep the stock row labels
+    return available_df[AVAILABLE_COLUMNS]
+
+# Function to load the sales records (snapshot plus pending sales)
+def load_sold():
+    sold_df = read_table(SOLD_FILE)
+    records = read_journal()
+    if records:
+        _, sold_df = apply_journal(None, sold_df, records)
+    return sold_df
+
+# Function to finish a compaction interrupted by a crash
+def recover_journal():
+    """Complete a compaction whose snapshot files were written but not yet swapped in."""
+    with journal_lock():
+        if not os.path.exists(COMPACT_MARKER):
+            return
+        for path in (table_file(STOCK_FILE), table_file(SOLD_FILE)):
+            if os.path.exists(f"{path}.tmp"):
+                os.replace(f"{path}.tmp", path)
+        if os.path.exists(JOURNAL_FILE) and os.path.getsize(JOURNAL_FILE):
+            open(JOURNAL_FILE, 'w').close()  # An empty journal keeps its signature, so the trip totals stay current
+        os.remove(COMPACT_MARKER)
+
+# Function to save full tables and fold the journal into the snapshots
+def write_tables(stock_df=None, sold_df=None):
+    """
+    Write new snapshot files and clear the journal.
+    Tables not passed in are rebuilt from snapshot plus journal so no pending sale is lost.
+    Callers that pass tables in hold journal_lock from the moment they read them, so the
+    journal cannot grow between that read and the truncation.
+    """
+    with journal_lock():
+        records = read_journal()
+        if records and (stock_df is None or sold_df is None):
+            journal_stock, journal_sold = apply_journal(read_table(STOCK_FILE), read_table(SOLD_FILE), records)
+            stock_df = journal_stock if stock_df is None else stock_df
+            sold_df = journal_sold if sold_df is None else sold_df
+
+        # Write both snapshots aside, then mark the compaction as committed before swapping them in
+        pending = [(path, df) for path, df in ((STOCK_FILE, stock_df), (SOLD_FILE, sold_df)) if df is not None]
+        for path, df in pending:
+            write_table(df, path, f"{table_file(path)}.tmp")
+        open(COMPACT_MARKER, 'w').close()
+        recover_journal()
+
+# Function to get the [mtime_ns, size] of a file (None if it does not exist)
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+# Function to read the sales archive manifest ({'source': snapshot signature, 'columns': [...], 'partitions': {month: {...}}})
+def read_sales_manifest():
+    if not os.path.exists(SALES_ARCHIVE_MANIFEST):
+        return None
+    with open(SALES_ARCHIVE_MANIFEST, encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to give the file of one month of the archive (sales/2024-10.csv, or .parquet / .feather)
+def sales_partition_file(month):
+    return os.path.join(SALES_ARCHIVE_DIR, f"{month}.csv")
+
+# Function to read one month of the archive with Selling Date as datetimes
+def read_sales_partition(month):
+    sales = read_table(sales_partition_file(month))
+    sales['Selling Date'] = pd.to_datetime(sales['Selling Date'], format='ISO8601')  # Written as ISO dates
+    return sales
+
+# Function to split the sales snapshot into monthly partitions, rewriting only the months whose rows changed
+def write_sales_archive(sold_df):
+    """
+    Sales without a valid Selling Date are left out: no period contains them. The manifest
+    records the signature of the snapshot it was built from; sales_between rebuilds the archive
+    when the snapshot changed some other way (e.g. edited by hand).
+    """
+    previous = read_sales_manifest() or {'partitions': {}}
+    sales = sold_df.copy()
+    sales['Selling Date'] = parse_selling_dates(sales['Selling Date']).values
+    sales = sales.dropna(subset=['Selling Date'])
+    os.makedirs(SALES_ARCHIVE_DIR, exist_ok=True)
+
+    # numpy formats the dates far faster than strftime
+    days = sales['Selling Date'].values.astype('datetime64[D]')
+    sales['Selling Date'] = days.astype(str)
+    row_hashes = pd.util.hash_pandas_object(sales, index=False).values  # Hashed once, sliced per month
+    partitions = {}
+    for month, positions in sorted(sales.groupby(days.astype('datetime64[M]').astype(str)).indices.items()):
+        month_days = days[positions]
+        digest = hashlib.sha256(row_hashes[positions].tobytes()).hexdigest()
+        partitions[month] = {'min': str(month_days.min()), 'max': str(month_days.max()), 'rows': len(positions), 'digest': digest}
+        path = table_file(sales_partition_file(month))
+        if previous['partitions'].get(month, {}).get('digest') != digest or not os.path.exists(path):
+            write_table(sales.iloc[positions].reset_index(drop=True), sales_partition_file(month))
+    for month in previous['partitions'].keys() - partitions.keys():
+        path = table_file(sales_partition_file(month))
+        if os.path.exists(path):
+            os.remove(path)
+
+    manifest = {'source': file_signature(table_file(SOLD_FILE)), 'columns': list(sold_df.columns), 'partitions': partitions}
+    with open(f"{SALES_ARCHIVE_MANIFEST}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{SALES_ARCHIVE_MANIFEST}.tmp", SALES_ARCHIVE_MANIFEST)
+    return manifest
+
+# Function to give the key a trip is totalled under (1, 1.0 and '1' are the same trip)
+def trip_key(value):
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+# Function to total product rows and sales rows per trip: {trip: {column: total}}
+def trip_rollup(products_df=None, sold_df=None):
+    parts = []
+    if products_df is not None and len(products_df):
+        count = pd.to_numeric(products_df['Count'], errors='coerce').fillna(0)
+        parts.append(pd.DataFrame({
+            'Trip #': products_df['Trip #'].astype(object),
+            'Gross_Cost': pd.to_numeric(products_df['Cost (USD)'], errors='coerce').fillna(0) * count,
+            'Expected_Selling_Price': pd.to_numeric(products_df['Expected Price (USD)'], errors='coerce').fillna(0) * count,
+            'Number_of_Products': count,
+            'Product_Rows': 1,
+        }))
+    if sold_df is not None and len(sold_df):
+        parts.append(pd.DataFrame({
+            'Trip #': sold_df['Trip #'].astype(object),
+            'Realized_Revenue': pd.to_numeric(sold_df['Final Price'], errors='coerce').fillna(0),
+            'Units_Sold': 1,
+            'Sale_Rows': 1,
+        }))
+    if not parts:
+        return {}
+
+    rows = pd.concat(parts, ignore_index=True).dropna(subset=['Trip #'])
+    columns = TRIP_TOTAL_COLUMNS + TRIP_ROW_COLUMNS
+    rows = rows.reindex(columns=['Trip #'] + columns).fillna({column: 0 for column in columns})
+    totals = rows.groupby(rows['Trip #'].map(trip_key))[columns].sum()
+    return {trip: {column: float(value) for column, value in row.items()} for trip, row in totals.iterrows()}
+
+# Function to add (sign=1) or subtract (sign=-1) a rollup from the per-trip totals
+def apply_trip_rollup(trips, rollup, sign=1):
+    for trip, values in rollup.items():
+        totals = trips.setdefault(trip, dict.fromkeys(TRIP_TOTAL_COLUMNS + TRIP_ROW_COLUMNS, 0.0))
+        for column, value in values.items():
+            totals[column] = round(totals[column] + sign * value, 6)  # No float drift from many small updates
+        if totals['Product_Rows'] <= 0 and totals['Sale_Rows'] <= 0:
+            del trips[trip]
+
+# Function to read trip_totals.json ({'sources': file signatures it reflects, 'trips': {trip: totals}})
+def read_trip_totals():
+    if not os.path.exists(TRIP_TOTALS_FILE):
+        return None
+    with open(TRIP_TOTALS_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to write trip_totals.json
+def write_trip_totals(totals):
+    with open(f"{TRIP_TOTALS_FILE}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(totals, f, indent=1, sort_keys=True)
+    os.replace(f"{TRIP_TOTALS_FILE}.tmp", TRIP_TOTALS_FILE)
+
+
+# Hash index over one cached table
+class TableIndex:
+    """Maps ID and (ID, size) to row labels so lookups do not scan every row of the table."""
+
+    def __init__(self, df):
+        self.by_id = {}
+        self.by_id_size = {}
+        if len(df):
+            self.by_id = {key: list(labels) for key, labels in df.groupby('ID', sort=False).groups.items()}
+            sizes = df['Sizes'].astype(str)
+            self.by_id_size = {key: list(labels) for key, labels in df.groupby([df['ID'], sizes], sort=False).groups.items()}
+
+    def insert(self, label, product_id, size):
+        self.by_id.setdefault(product_id, []).append(label)
+        self.by_id_size.setdefault((product_id, str(size)), []).append(label)
+
+    def remove(self, label, product_id, size):
+        for index, key in ((self.by_id, product_id), (self.by_id_size, (product_id, str(size)))):
+            labels = index.get(key, [])
+            if label in labels:
+                labels.remove(label)
+            if not labels:
+                index.pop(key, None)
+
+    def labels(self, product_id, size=None):
+        if size is None:
+            return list(self.by_id.get(product_id, []))
+        return list(self.by_id_size.get((product_id, str(size)), []))
+
+
+class SearchIndex:
+    """
+    Trigram index over the ID, name, brand and color of the available products (one entry per ID).
+    Queries are plain text, never regular expressions. A product matches when, for every query
+    word, it shares at least half of that word's trigrams, which tolerates typos ("jordna").
+    Products containing every query word come first, then by how many trigrams they share.
+    """
+
+    def __init__(self, available_df):
+        products = available_df.drop_duplicates('ID')
+        self.ids = products['ID'].astype(str).tolist()
+        self.words = []
+        self.grams = {}  # trigram -> positions in self.ids
+        for position, values in enumerate(zip(products['ID'], products['Name'], products['Brand'], products['Color'])):
+            words = search_tokens(' '.join(str(value) for value in values if not pd.isna(value)))
+            self.words.append(set(words))
+            for gram in self.trigrams(words):
+                self.grams.setdefault(gram, set()).add(position)
+
+    @staticmethod
+    def trigrams(words):
+        grams = set()
+        for word in words:
+            padded = f"  {word} "  # Padding lets one- and two-letter words and prefixes match
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+
+    # Function to return the matching product IDs, best match first (every product for an empty query)
+    def search(self, query, min_share=0.5):
+        words = search_tokens(query)
+        if not words:
+            return list(self.ids)
+
+        # Every query word has to match: a product qualifies for a word when it shares at least
+        # min_share of the word's trigrams, and its score adds up those shares
+        candidates = None
+        scores = Counter()
+        for query_word in words:
+            word_grams = self.trigrams([query_word])
+            shared = Counter()
+            for gram in word_grams:
+                shared.update(self.grams.get(gram, ()))
+            matched = {position for position, count in shared.items() if count / len(word_grams) >= min_share}
+            candidates = matched if candidates is None else candidates & matched
+            for position in matched:
+                scores[position] += shared[position] / len(word_grams)
+
+        ranked = []
+        for position in candidates:
+            whole_words = all(any(word.startswith(query_word) for word in self.words[position]) for query_word in words)
+            ranked.append((not whole_words, -scores[position], position))
+        return [self.ids[position] for *_, position in sorted(ranked)]
+
+
+# Session-level cache of the three data files
+class Repository:
+    """
+    Loads products.csv, stock.csv and sold.csv once per session and keeps them in memory.
+    A table is re-read only when one of its files changes size or mtime (e.g. another process
+    wrote it); every save goes straight to disk and refreshes the cached copy.
+    Each cached table carries a TableIndex that inserts, updates and deletes keep current.
+    A recorded sale only appends to the journal; the cached sales table gets the new rows in one
+    concat the next time it is read, so a sale does not copy the whole sales history.
+    Writes that touch the stock or sales hold journal_lock from reading the tables to saving them.
+    The per-trip totals in trip_totals.json are updated with just the rows each write adds or
+    removes, and remember the file signatures they match; if products or sales changed some
+    other way, they are rebuilt from the tables on the next read.
+    """
+
+    def __init__(self):
+        self.tables = {}  # name -> (file signature, DataFrame)
+        self.indexes = {}  # name -> TableIndex of the cached DataFrame
+        self.pending = {}  # name -> rows recorded since the cached DataFrame was built
+
+    # Files each table is built from (stock and sold include the pending journal)
+    def sources(self, name):
+        return {
+            'products': (table_file(PRODUCTS_FILE),),
+            'stock': (table_file(STOCK_FILE), JOURNAL_FILE),
+            'sold': (table_file(SOLD_FILE), JOURNAL_FILE),
+        }[name]
+
+    def loader(self, name):
+        return {
+            'products': lambda: read_table(PRODUCTS_FILE),
+            'stock': load_stock,
+            'sold': load_sold,
+        }[name]
+
+    def signature(self, name):
+        return tuple(file_signature(path) for path in self.sources(name))
+
+    def is_fresh(self, name):
+        return name in self.tables and self.tables[name][0] == self.signature(name)
+
+    # The cached DataFrame itself (reloaded if the files changed); never handed out to callers
+    def frame(self, name):
+        if not self.is_fresh(name):
+            self.store(name, self.loader(name)())
+        elif self.pending.get(name):
+            self.apply_pending(name)
+        return self.tables[name][1]
+
+    # Function to queue rows already written to disk (journal) for the cached table, without copying it
+    def defer_rows(self, name, rows):
+        self.tables[name] = (self.signature(name), self.tables[name][1])
+        self.pending.setdefault(name, []).extend(rows)
+
+    # Function to append the queued rows to the cached table (and its index) in one concat
+    def apply_pending(self, name):
+        rows = self.pending.pop(name)
+        signature, df = self.tables[name]
+        first_label = df.index.max() + 1 if len(df) else 0
+        rows_df = pd.DataFrame(rows, index=range(first_label, first_label + len(rows)))
+        index = self.indexes.get(name)
+        if index is not None:
+            for label, product_id, size in zip(rows_df.index, rows_df['ID'], rows_df['Sizes']):
+                index.insert(label, product_id, size)
+        self.tables[name] = (signature, pd.concat([df, rows_df]))
+
+    def get(self, name):
+        return self.frame(name).copy()  # Callers are free to modify what they get back
+
+    def index(self, name):
+        df = self.frame(name)
+        if name not in self.indexes:
+            self.indexes[name] = TableIndex(df)
+        return self.indexes[name]
+
+    def store(self, name, df, index=None):
+        self.tables[name] = (self.signature(name), df)
+        self.pending.pop(name, None)
+        if name in ('products', 'stock'):
+            self.indexes.pop('search', None)  # The search index covers the available products
+        if index is None:
+            self.indexes.pop(name, None)  # Rebuilt on the next lookup
+        else:
+            self.indexes[name] = index
+
+    def products(self):
+        return self.get('products')
+
+    # Files the per-trip totals are computed from, as stored in trip_totals.json
+    def trip_sources(self):
+        return [list(stat) if stat else None for stat in self.signature('products') + self.signature('sold')]
+
+    # Function to get the per-trip totals as a table (one row per trip)
+    def trip_totals(self):
+        totals = read_trip_totals()
+        if totals is None or totals['sources'] != self.trip_sources():
+            trips = trip_rollup(self.frame('products'), self.frame('sold'))
+            totals = {'sources': self.trip_sources(), 'trips': trips}  # Signed after loading, which may create the files
+            write_trip_totals(totals)
+        summary = pd.DataFrame.from_dict(totals['trips'], orient='index', columns=TRIP_TOTAL_COLUMNS)
+        return summary.rename_axis('Trip #').reset_index()
+
+    # Function to get the totals a write to `name` keeps current (None if they are already stale).
+    # A stock write changes no total, but it can fold journal sales into sold.csv: same sales, new files
+    def trip_totals_before_write(self, name):
+        totals = read_trip_totals()
+        if totals is None or totals['sources'] != self.trip_sources():
+            return None  # Rebuilt on the next read
+        return totals
+
+    # Function to apply the rows a write added and removed to the totals and record the files they now match
+    def trip_totals_after_write(self, totals, name, added=None, removed=None):
+        if totals is None:
+            return
+        for rows, sign in ((removed, -1), (added, 1)):
+            if rows is not None and name != 'stock':
+                rollup = trip_rollup(products_df=rows) if name == 'products' else trip_rollup(sold_df=rows)
+                apply_trip_rollup(totals['trips'], rollup, sign)
+        totals['sources'] = self.trip_sources()
+        write_trip_totals(totals)
+
+    # Function to get the available products: the stock joined with the product attributes
+    def available(self):
+        return join_stock(self.frame('stock'), self.frame('products'))
+
+    def sold(self):
+        return self.get('sold')
+
+    # Function to look up rows by ID, or by ID and size, through the index
+    def find(self, name, product_id, size=None):
+        df = self.frame(name)
+        return df.loc[self.index(name).labels(product_id, size)].copy()
+
+    # Function to get the search index over the available products (built on first use, dropped on writes)
+    def search_index(self):
+        self.frame('products')
+        self.frame('stock')  # Reloading a changed table drops the stale index
+        if 'search' not in self.indexes:
+            self.indexes['search'] = SearchIndex(self.available())
+        return self.indexes['search']
+
+    # Function to look up available rows (stock plus product attributes) by ID, or by ID and size
+    def find_available(self, product_id, size=None):
+        stock_rows = self.find('stock', product_id, size)
+        if stock_rows.empty:
+            return pd.DataFrame(columns=AVAILABLE_COLUMNS)
+        return join_stock(stock_rows, self.find('products', product_id))
+
+    def save(self, name, df, index=None):
+        if STORAGE_FORMAT in COLUMNAR_FORMATS:
+            df = apply_schema(df)  # Keep the cached copy as compact as a freshly loaded one
+        if name == 'products':
+            write_table(df, PRODUCTS_FILE)
+            self.store(name, df.copy(), index)
+        elif name == 'stock':
+            self.save_tables(stock_df=df, stock_index=index)
+        else:
+            self.save_tables(sold_df=df, sold_index=index)
+
+    def save_tables(self, stock_df=None, sold_df=None, stock_index=None, sold_index=None):
+        if STORAGE_FORMAT in COLUMNAR_FORMATS:
+            stock_df = None if stock_df is None else apply_schema(stock_df)
+            sold_df = None if sold_df is None else apply_schema(sold_df)
+        write_tables(stock_df=stock_df, sold_df=sold_df)
+        # Split from the file just written (not sold_df) so the month digests match a rebuild from disk
+        self.sales_archive()
+        # A table that was not passed in may have absorbed journal sales, so reload it lazily
+        for name, df, index in (('stock', stock_df, stock_index), ('sold', sold_df, sold_index)):
+            if df is None:
+                self.tables.pop(name, None)
+                self.indexes.pop(name, None)
+                self.pending.pop(name, None)
+            else:
+                self.store(name, df.copy(), index)
+
+    # Function to append rows to a table, indexing only the new rows
+    def insert_rows(self, name, rows_df):
+        with journal_lock():
+            totals = self.trip_totals_before_write(name)
+            df = self.frame(name)
+            index = self.index(name)
+            first_label = df.index.max() + 1 if len(df) else 0
+            rows_df = rows_df.set_axis(range(first_label, first_label + len(rows_df)))
+            for label, product_id, size in zip(rows_df.index, rows_df['ID'], rows_df['Sizes']):
+                index.insert(label, product_id, size)
+            self.save(name, pd.concat([df, rows_df]), index)
+            self.trip_totals_after_write(totals, name, added=rows_df)
+
+    # Function to update the rows of one ID in place
+    def update_rows(self, name, product_id, columns, values):
+        with journal_lock():
+            totals = self.trip_totals_before_write(name)
+            df = self.frame(name).copy()
+            index = self.index(name)
+            labels = index.labels(product_id)
+            old_rows = df.loc[labels].copy()
+            for label in labels:
+                index.remove(label, product_id, df.at[label, 'Sizes'])
+            # Categorical columns (columnar backend) need new values registered as categories first
+            for column, value in zip(columns, values):
+                if isinstance(df[column].dtype, pd.CategoricalDtype) and pd.notna(value) and value not in df[column].cat.categories:
+                    df[column] = df[column].cat.add_categories([value])
+            df.loc[labels, columns] = values
+            for label in labels:
+                index.insert(label, product_id, df.at[label, 'Sizes'])
+            self.save(name, df, index)
+            self.trip_totals_after_write(totals, name, added=df.loc[labels], removed=old_rows)
+
+    # Function to delete the rows of one ID
+    def delete_rows(self, name, product_id):
+        with journal_lock():
+            totals = self.trip_totals_before_write(name)
+            df = self.frame(name)
+            index = self.index(name)
+            labels = index.labels(product_id)
+            removed = df.loc[labels]
+            for label in labels:
+                index.remove(label, product_id, df.at[label, 'Sizes'])
+            self.save(name, df.drop(labels), index)
+            self.trip_totals_after_write(totals, name, removed=removed)
+
+    def record_sale(self, sold_entry):
+        with journal_lock():
+            totals = self.trip_totals_before_write('sold')
+            record = {'op': 'sale', 'sale': sold_entry}
+            fresh = self.is_fresh('stock') and self.is_fresh('sold')
+            if fresh:
+                stock_index = self.index('stock')
+            append_journal([record])
+
+            # Apply the sale to the cached tables instead of re-reading them
+            if fresh:
+                stock_df = self.tables['stock'][1]  # Never handed out, so it is decremented in place
+                product_id, size = sold_entry['ID'], sold_entry['Size Sold']
+                label = stock_index.labels(product_id, size)[0]
+                stock_df.at[label, 'Count'] -= 1
+                if stock_df.at[label, 'Count'] <= 0:
+                    stock_index.remove(label, product_id, size)
+                    stock_df = stock_df.drop(label)
+                self.store('stock', stock_df, stock_index)
+                self.defer_rows('sold', [sold_entry])
+
+            # Fold the journal into stock.csv and sold.csv every COMPACT_EVERY sales
+            if len(read_journal()) >= COMPACT_EVERY:
+                self.compact()
+            self.trip_totals_after_write(totals, 'sold', added=pd.DataFrame([sold_entry]))
+
+    # Function to journal a batch of sales with a single append
+    def record_sales(self, sold_entries):
+        with journal_lock():
+            totals = self.trip_totals_before_write('sold')
+            records = [{'op': 'sale', 'sale': entry} for entry in sold_entries]
+            fresh = self.is_fresh('stock') and self.is_fresh('sold')
+            append_journal(records)
+
+            # One grouped decrement on the cached stock (its index is rebuilt on the next lookup)
+            if fresh:
+                stock_df, _ = apply_journal(self.tables['stock'][1], None, records)
+                self.store('stock', stock_df)
+                self.defer_rows('sold', sold_entries)
+
+            if len(read_journal()) >= COMPACT_EVERY:
+                self.compact()
+            self.trip_totals_after_write(totals, 'sold', added=pd.DataFrame(sold_entries))
+
+    def compact(self):
+        with journal_lock():
+            if read_journal():
+                totals = self.trip_totals_before_write('sold')
+                self.save_tables(self.frame('stock'), self.frame('sold'),
+                                 self.indexes.get('stock'), self.indexes.get('sold'))
+                self.trip_totals_after_write(totals, 'sold')  # Same sales, new files
+
+    # Function to get the sales archive manifest, rebuilding the archive if the snapshot changed behind its back
+    def sales_archive(self):
+        manifest = read_sales_manifest()
+        if manifest is None or manifest['source'] != file_signature(table_file(SOLD_FILE)):
+            manifest = write_sales_archive(read_table(SOLD_FILE))
+        return manifest
+
+    # Function to get the sales made between two dates (inclusive)
+    def sales_between(self, start_date, end_date):
+        """Open only the monthly partitions whose dates overlap the period, plus the sales still in the journal."""
+        start_date, end_date = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+        manifest = self.sales_archive()
+        parts = [read_sales_partition(month) for month, partition in manifest['partitions'].items()
+                 if pd.Timestamp(partition['min']) <= end_date and pd.Timestamp(partition['max']) >= start_date]
+
+        pending = [record['sale'] for record in read_journal() if record.get('op') == 'sale']
+        if pending:
+            pending_df = pd.DataFrame(pending)
+            pending_df['Selling Date'] = parse_selling_dates(pending_df['Selling Date'])
+            parts.append(pending_df)
+        if not parts:
+            return pd.DataFrame(columns=manifest['columns'])
+
+        sold_df = pd.concat(parts, ignore_index=True)
+        return sold_df[(sold_df['Selling Date'] >= start_date) & (sold_df['Selling Date'] <= end_date)]
+
+
+# Function to turn a pandas/numpy value into something sqlite3 can bind
+def sql_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value.item() if hasattr(value, 'item') else value
+
+
+# SQLite storage behind the same interface as Repository
+class SqliteRepository(Repository):
+    """
+    Keeps the three tables in fily.db. Lookups use the table indexes, a sale is one
+    transaction (UPDATE of the stock row + INSERT of the sale) and date ranges use the
+    Selling Date index. The database is created from the CSV files the first time.
+    Whole tables are still cached in memory and re-read only when the database changes.
+    The per-trip totals are a table of their own that triggers on products and sold keep current.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.conn = None
+
+    def connection(self):
+        if self.conn is None:
+            new_database = not os.path.exists(DATABASE_FILE)
+            self.conn = sqlite3.connect(DATABASE_FILE)
+            self.conn.executescript(SQLITE_SCHEMA)
+            if new_database:
+                self.migrate_from_csv()
+            # Each migration checks on its own whether it is still needed; together they are one transaction
+            with self.conn:
+                if 'available' in self.table_names():
+                    # Databases created before the stock table kept denormalized available rows
+                    self.conn.execute('INSERT INTO stock SELECT "ID", "Sizes", "Count" FROM available')
+                    self.conn.execute('DROP TABLE available')
+                # Selling Dates stored as typed before they were normalized on write
+                typed = self.conn.execute('SELECT rowid, "Selling Date" FROM sold WHERE "Selling Date" NOT GLOB ?',
+                                          ('[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]',)).fetchall()
+                if typed:
+                    dates = iso_selling_dates([date for _, date in typed])
+                    self.conn.executemany('UPDATE sold SET "Selling Date" = ? WHERE rowid = ?',
+                                          [(date, rowid) for (rowid, old), date in zip(typed, dates) if date != old])
+                if self.conn.execute('SELECT 1 FROM trip_totals LIMIT 1').fetchone() is None:
+                    # Databases created before trip_totals existed (the triggers only see later writes)
+                    self.conn.execute(SQLITE_TRIP_TOTALS_BACKFILL)
+        return self.conn
+
+    # Function to load products.csv, stock.csv and sold.csv (plus pending journal sales) into the database
+    def migrate_from_csv(self):
+        tables = {'products': pd.read_csv(PRODUCTS_FILE), 'stock': load_stock(), 'sold': load_sold()}
+        with self.conn:
+            for name, df in tables.items():
+                self.insert_frame(name, df)
+        print(f"Created {DATABASE_FILE} from {PRODUCTS_FILE}, {STOCK_FILE} and {SOLD_FILE}.")
+
+    def table_names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def table_columns(self, name):
+        return [row[1] for row in self.connection().execute(f'PRAGMA table_info("{name}")')]
+
+    def insert_frame(self, name, df):
+        columns = [column for column in self.table_columns(name) if column in df.columns]
+        df = df[columns].copy()
+        if 'Selling Date' in df.columns:
+            df['Selling Date'] = iso_selling_dates(df['Selling Date'])  # Text that sorts and compares as dates
+        if 'Sizes' in df.columns:
+            df['Sizes'] = df['Sizes'].where(df['Sizes'].isna(), df['Sizes'].astype(str))
+        placeholders = ', '.join('?' for _ in columns)
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        rows = [[sql_value(value) for value in row] for row in df.itertuples(index=False)]
+        self.connection().executemany(f'INSERT INTO "{name}" ({column_list}) VALUES ({placeholders})', rows)
+
+    # Every table lives in the same file, so any write invalidates all cached copies
+    def sources(self, name):
+        return (DATABASE_FILE,)
+
+    def loader(self, name):
+        return lambda: pd.read_sql_query(f'SELECT * FROM "{name}"', self.connection())
+
+    def forget(self):
+        self.tables.clear()
+        self.indexes.clear()
+        self.pending.clear()
+
+    def find(self, name, product_id, size=None):
+        if size is None:
+            return pd.read_sql_query(f'SELECT * FROM "{name}" WHERE "ID" = ?', self.connection(), params=(product_id,))
+        return pd.read_sql_query(f'SELECT * FROM "{name}" WHERE "ID" = ? AND "Sizes" = ?', self.connection(), params=(product_id, str(size)))
+
+    def save(self, name, df, index=None):
+        with self.connection():
+            self.conn.execute(f'DELETE FROM "{name}"')
+            self.insert_frame(name, df)
+        self.forget()
+
+    def save_tables(self, stock_df=None, sold_df=None, stock_index=None, sold_index=None):
+        with self.connection():
+            for name, df in (('stock', stock_df), ('sold', sold_df)):
+                if df is not None:
+                    self.conn.execute(f'DELETE FROM "{name}"')
+                    self.insert_frame(name, df)
+        self.forget()
+
+    def insert_rows(self, name, rows_df):
+        with self.connection():
+            self.insert_frame(name, rows_df)
+        self.forget()
+
+    def update_rows(self, name, product_id, columns, values):
+        values = [iso_selling_dates([value])[0] if column == 'Selling Date' else value for column, value in zip(columns, values)]
+        assignments = ', '.join(f'"{column}" = ?' for column in columns)
+        with self.connection():
+            self.conn.execute(f'UPDATE "{name}" SET {assignments} WHERE "ID" = ?', [sql_value(value) for value in values] + [product_id])
+        self.forget()
+
+    def delete_rows(self, name, product_id):
+        with self.connection():
+            self.conn.execute(f'DELETE FROM "{name}" WHERE "ID" = ?', (product_id,))
+        self.forget()
+
+    # Function to decrement the stock and insert the sales in one transaction
+    def record_sales(self, sold_entries):
+        sales = pd.DataFrame(sold_entries)
+        decrements = sales.groupby(['ID', 'Size Sold']).size()
+        with self.connection():
+            self.conn.executemany('UPDATE stock SET "Count" = "Count" - ? WHERE "ID" = ? AND "Sizes" = ?',
+                                  [(int(count), product_id, str(size)) for (product_id, size), count in decrements.items()])
+            self.conn.execute('DELETE FROM stock WHERE "Count" <= 0')
+            self.insert_frame('sold', sales)
+        self.forget()
+
+    def record_sale(self, sold_entry):
+        self.record_sales([sold_entry])
+
+    def trip_totals(self):
+        columns = ', '.join(f'"{column}"' for column in ['Trip #'] + TRIP_TOTAL_COLUMNS)
+        return pd.read_sql_query(f'SELECT {columns} FROM trip_totals', self.connection())
+
+    # Sales are written straight into the database, so there is no journal to fold in
+    def compact(self):
+        pass
+
+    def sales_between(self, start_date, end_date):
+        # Dates are stored as ISO text, so the Selling Date index answers the range by whole days
+        start_date, end_date = pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d')
+        sold_df = pd.read_sql_query('SELECT * FROM sold WHERE "Selling Date" BETWEEN ? AND ?', self.connection(),
+                                    params=(start_date, end_date))
+        sold_df['Selling Date'] = pd.to_datetime(sold_df['Selling Date'])
+        return sold_df
+
+
+# Shared by every menu action during the session
+repo = SqliteRepository() if STORAGE_FORMAT == 'sqlite' else Repository()
+
+
+# Function to hold an exclusive lock file across processes
+@contextmanager
+def file_lock(path, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            # A lock older than the timeout was left behind by a crashed process
+            try:
+                if time.time() - os.path.getmtime(path) > timeout:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"Could not acquire lock {path}")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+# Function to rebuild the per-prefix ID counters from the products table
+def rebuild_id_counters(products_df):
+    parts = products_df['ID'].astype(str).str.extract(r'^(\D+)(\d+)$').dropna()
+    highest = parts[1].astype(int).groupby(parts[0]).max()
+    return {prefix: int(number) for prefix, number in highest.items()}
+
+# Function to reserve a block of ID numbers per prefix (e.g. {"HW": 3} -> {"HW": 2} reserves HW02-HW04)
+def allocate_id_blocks(prefix_counts):
+    """Reserve numbers in id_counters.json and return the first one per prefix; safe when several people add products at once."""
+    with file_lock(ID_COUNTERS_LOCK):
+        if os.path.exists(ID_COUNTERS_FILE):
+            with open(ID_COUNTERS_FILE, encoding='utf-8') as f:
+                counters = json.load(f)
+        else:
+            counters = rebuild_id_counters(repo.products())
+
+        first_numbers = {}
+        for prefix, count in prefix_counts.items():
+            first_numbers[prefix] = counters.get(prefix, 0) + 1
+            counters[prefix] = counters.get(prefix, 0) + int(count)
+
+        tmp_path = f"{ID_COUNTERS_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(counters, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, ID_COUNTERS_FILE)
+
+    return first_numbers
+
+# Function to allocate the next product ID for a prefix (e.g. HW -> HW02)
+def allocate_product_id(prefix):
+    return f"{prefix}{allocate_id_blocks({prefix: 1})[prefix]:02d}"
 
 
 # Function to add products
 def add_product():
-    df = pd.read_csv(PRODUCTS_FILE)
-
     # Input product details
     print("\nTypes: type (S = Sneakers, T = T-Shirts, H = Hoodies, J = Jacket, O = Other, P = Pullover)")
     product_type_input = input("Enter product type: ")
@@ -47,17 +1166,8 @@ def add_product():
     type_code = product_type_input[0].upper()  # Get the first letter of the type
     gender_code = gender_input[0].upper()  # Get the first letter of the gender
     
-    # Find the next number for the ID
-    existing_ids = df[df['ID'].str.startswith(f"{type_code}{gender_code}")]['ID']
-
-    if existing_ids.empty:
-        new_number = 1  # Start numbering from 1 if none exist
-    else:
-        existing_numbers = existing_ids.str.extract(r'(\d+)$').astype(int)
-        new_number = existing_numbers.max()[0] + 1
-
-    # Format the ID
-    product_id = f"{type_code}{gender_code}{new_number:02d}"  # Generate ID like HW01
+    # Reserve the next number for this prefix from the counter table
+    product_id = allocate_product_id(f"{type_code}{gender_code}")  # Generate ID like HW01
 
     # Use pd.concat to append the new product
     new_row_df = pd.DataFrame([{
@@ -74,45 +1184,99 @@ def add_product():
         'Count': sum(size_counts.values())  # Store total count
     }])
     
-    df = pd.concat([df, new_row_df], ignore_index=True)
-    df.to_csv(PRODUCTS_FILE, index=False)
+    repo.insert_rows('products', new_row_df)
     print(f"Product added with ID: {product_id}")
 
-    # Also add to available products
-    available_df = pd.DataFrame(columns=['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Trip #', 'Sizes', 'Count'])
-
-    for size, count in size_counts.items():
-        available_product = {
-            'ID': product_id,
-            'Type': product_type_input,
-            'Gender': gender_input,
-            'Brand': brand,
-            'Name': name,
-            'Color': color,
-            'Cost (USD)': cost,
-            'Expected Price (USD)': expected_price,
-            'Trip #': trip_number,
-            'Sizes': size,  # Store each size in a new row
-            'Count': count  # Store the count for this size
-        }
-        available_df = pd.concat([available_df, pd.DataFrame([available_product])], ignore_index=True)
+    # Also add the stock: one (ID, size, count) row per size
+    stock_df = pd.DataFrame({
+        'ID': product_id,
+        'Sizes': list(size_counts.keys()),
+        'Count': list(size_counts.values()),
+    })
+    repo.insert_rows('stock', stock_df)
 
-    # Write to available.csv
-    if os.path.exists(AVAILABLE_FILE):
-        existing_available_df = pd.read_csv(AVAILABLE_FILE)
-        available_df = pd.concat([existing_available_df, available_df], ignore_index=True)
+# Function to read and validate a product manifest (CSV or JSONL)
+def read_product_manifest(manifest_path):
+    """
+    Return (manifest DataFrame, list of errors). Nothing is written when there are errors,
+    so a bad line never leaves half a shipment imported.
+    """
+    if manifest_path.lower().endswith(('.jsonl', '.json')):
+        manifest = pd.read_json(manifest_path, lines=True, dtype=False)
+        first_line = 1
+    else:
+        manifest = pd.read_csv(manifest_path, dtype=str, keep_default_na=False)
+        first_line = 2  # Line 1 is the CSV header
+
+    required = ['Type', 'Gender', 'Brand', 'Name', 'Cost (USD)', 'Expected Price (USD)', 'Trip #', 'Sizes']
+    missing = [column for column in required if column not in manifest.columns]
+    if missing:
+        return manifest, [f"Missing columns: {', '.join(missing)}"]
+    if 'Color' not in manifest.columns:
+        manifest['Color'] = ''
+
+    # JSONL may list the sizes (["M", "L"]) instead of writing them comma separated
+    manifest['Sizes'] = manifest['Sizes'].map(lambda sizes: ', '.join(map(str, sizes)) if isinstance(sizes, list) else sizes)
+    text_columns = ['Type', 'Gender', 'Brand', 'Name', 'Color', 'Trip #', 'Sizes']
+    manifest[text_columns] = manifest[text_columns].fillna('').astype(str).apply(lambda column: column.str.strip())
+    for column in ['Cost (USD)', 'Expected Price (USD)']:
+        manifest[column] = pd.to_numeric(manifest[column], errors='coerce')
+
+    # Check every line at once; line numbers are those of the file (a CSV header is line 1)
+    errors = []
+    checks = {
+        'missing type': manifest['Type'] == '',
+        'missing gender': manifest['Gender'] == '',
+        'missing name': manifest['Name'] == '',
+        'missing sizes': manifest['Sizes'].str.replace(',', '').str.strip() == '',
+        'invalid cost': manifest['Cost (USD)'].isna(),
+        'invalid expected price': manifest['Expected Price (USD)'].isna(),
+    }
+    for problem, mask in checks.items():
+        for position in manifest.index[mask.values]:
+            errors.append((position + first_line, problem))
+    return manifest, [f"Line {line}: {problem}" for line, problem in sorted(errors)]
+
+# Function to add many products at once from a manifest file
+def import_products(manifest_path):
+    manifest, errors = read_product_manifest(manifest_path)
+    if errors:
+        print(f"Manifest {manifest_path} has {len(errors)} problem(s); nothing was imported:")
+        for error in errors:
+            print(f"  {error}")
+        return []
+    if manifest.empty:
+        print("Manifest is empty.")
+        return []
+
+    # Allocate one block of IDs per prefix and number the products inside each block
+    prefixes = manifest['Type'].str[0].str.upper() + manifest['Gender'].str[0].str.upper()
+    first_numbers = allocate_id_blocks(prefixes.value_counts().to_dict())
+    numbers = prefixes.map(first_numbers) + manifest.groupby(prefixes).cumcount()
+    manifest['ID'] = prefixes + numbers.astype(str).str.zfill(2)
+
+    # Explode the comma-separated sizes into one (ID, size, count) row each
+    sizes = manifest[['ID', 'Sizes']].assign(Sizes=manifest['Sizes'].str.split(',')).explode('Sizes')
+    sizes['Sizes'] = sizes['Sizes'].str.strip()
+    sizes = sizes[sizes['Sizes'] != '']
+    size_counts = sizes.groupby(['ID', 'Sizes'], sort=False).size().rename('Count').reset_index()
+
+    attributes = manifest[PRODUCT_ATTRIBUTES]
+    products_rows = attributes.merge(size_counts.groupby('ID', sort=False).agg(Sizes=('Sizes', ', '.join), Count=('Count', 'sum')).reset_index(), on='ID')
+
+    # One write per target file
+    repo.insert_rows('products', products_rows)
+    repo.insert_rows('stock', size_counts)
+    print(f"Imported {len(products_rows)} products ({int(size_counts['Count'].sum())} units): {', '.join(products_rows['ID'])}")
+    return products_rows['ID'].tolist()
 
-    available_df.to_csv(AVAILABLE_FILE, index=False)
 
 # Function to process sold items
 def process_sold_item():
-    available_df = pd.read_csv(AVAILABLE_FILE)  # Load available products from the available file
-    sold_df = pd.read_csv(SOLD_FILE)  # Load sold items from the sold file
-
     product_id = input("Enter product ID sold: ")
     
-    # Find the available sizes for the product ID
-    available_sizes = available_df[available_df['ID'] == product_id]['Sizes'].values
+    # Find the available sizes for the product ID (index lookup, includes sales still in the journal)
+    available_sizes = repo.find('stock', product_id)['Sizes'].astype(str).values
     if available_sizes.size == 0:
         print("Product ID not found.")
         return
@@ -128,7 +1292,7 @@ def process_sold_item():
     notes = input("Enter notes: ")
 
     # Check if the product ID and size are available
-    sold_item = available_df[(available_df['ID'] == product_id) & (available_df['Sizes'] == size)]
+    sold_item = repo.find_available(product_id, size)
     
     if sold_item.empty:
         print("Item not available in the specified size.")
@@ -144,38 +1308,78 @@ def process_sold_item():
         'Size Sold': size  # Store the sold size
     }
 
-    # Convert sold_entry to DataFrame and concatenate
-    sold_entry_df = pd.DataFrame([sold_entry])
-    sold_df = pd.concat([sold_df, sold_entry_df], ignore_index=True)
-    sold_df.to_csv(SOLD_FILE, index=False)
-
-    # Update available items: Decrease the count for the sold size
-    available_df.loc[(available_df['ID'] == product_id) & (available_df['Sizes'] == size), 'Count'] -= 1  # Decrement the count by 1
-    
-    # Remove entries where count is zero
-    available_df = available_df[available_df['Count'] > 0]
-
-    # Save changes to available products
-    available_df.to_csv(AVAILABLE_FILE, index=False)
+    # Record the sale as a single journal line; the stock decrement is replayed from it
+    repo.record_sale(sold_entry)
     print("Item processed and recorded as sold.")
 
+# Function to record many sales at once from a file (e.g. WhatsApp/Instagram orders)
+def import_sales(sales_path):
+    """
+    Read (ID, Size, Selling Date, Final Price, Customer, Notes) rows, match the whole batch against
+    the available stock and journal every line that is in stock with a single append.
+    Lines asking for more units than are available are reported and left out.
+    """
+    if sales_path.lower().endswith(('.jsonl', '.json')):
+        sales = pd.read_json(sales_path, lines=True, dtype=False)
+        first_line = 1
+    else:
+        sales = pd.read_csv(sales_path, dtype=str, keep_default_na=False)
+        first_line = 2  # Line 1 is the CSV header
+    sales = sales.rename(columns={'Size Sold': 'Size'})
+
+    missing = [column for column in ['ID', 'Size', 'Selling Date', 'Final Price'] if column not in sales.columns]
+    if missing:
+        print(f"Missing columns: {', '.join(missing)}; nothing was recorded.")
+        return []
+    for column in ['Customer', 'Notes']:
+        if column not in sales.columns:
+            sales[column] = ''
+
+    text_columns = ['ID', 'Size', 'Selling Date', 'Customer', 'Notes']
+    sales[text_columns] = sales[text_columns].fillna('').astype(str).apply(lambda column: column.str.strip())
+    sales['Final Price'] = pd.to_numeric(sales['Final Price'], errors='coerce')
+    sales['Line'] = sales.index + first_line
+
+    invalid = sales[sales['Final Price'].isna() | parse_selling_dates(sales['Selling Date']).isna()]
+    if not invalid.empty:
+        print(f"Invalid price or date on line(s) {', '.join(map(str, invalid['Line']))}; nothing was recorded.")
+        return []
+
+    # Join the batch against the stock; the n-th unit of an (ID, size) fits if n <= Count
+    available_df = repo.available()
+    available_df['Sizes'] = available_df['Sizes'].astype(str)
+    stock = available_df.drop_duplicates(['ID', 'Sizes'])
+    merged = sales.merge(stock, how='left', left_on=['ID', 'Size'], right_on=['ID', 'Sizes'])
+    merged['Unit'] = merged.groupby(['ID', 'Size']).cumcount() + 1
+    in_stock = merged['Unit'] <= merged['Count'].fillna(0)
+
+    for _, line in merged[~in_stock].iterrows():
+        reason = "not in stock" if pd.isna(line['Count']) else f"oversold (only {int(line['Count'])} available)"
+        print(f"Line {line['Line']}: {line['ID']} size {line['Size']} {reason}")
+
+    accepted = merged[in_stock].rename(columns={'Size': 'Size Sold'})
+    if accepted.empty:
+        print("No sales recorded.")
+        return []
+
+    sold_columns = list(stock.columns) + ['Selling Date', 'Final Price', 'Customer', 'Notes', 'Size Sold']
+    repo.record_sales(accepted[sold_columns].to_dict('records'))
+    print(f"Recorded {len(accepted)} sale(s); {int((~in_stock).sum())} line(s) skipped.")
+    return accepted['Line'].tolist()
+
 # Function to calculate expected profit
 def calculate_expected_profit():
-    df = pd.read_csv(PRODUCTS_FILE)
-    
-    # Calculate total cost and expected selling price by multiplying with the Count
-    df['Total_Cost'] = df['Cost (USD)'] * df['Count']
-    df['Total_Expected_Price'] = df['Expected Price (USD)'] * df['Count']
-
-    # Aggregate by Trip # to get the total costs and prices
-    profit_summary = df.groupby('Trip #').agg(
-        Gross_Cost=('Total_Cost', 'sum'),
-        Expected_Selling_Price=('Total_Expected_Price', 'sum'),
-        Number_of_Products=('Count', 'sum')  # Sum of counts for each trip
-    ).reset_index()
+    # The per-trip totals are kept up to date on every write, so this reads them instead of scanning the products
+    profit_summary = repo.trip_totals()
+    profit_summary['Trip #'] = profit_summary['Trip #'].map(trip_key)
+    profit_summary = profit_summary.sort_values('Trip #', key=lambda trips: pd.to_numeric(trips, errors='coerce')).reset_index(drop=True)
+    profit_summary[TRIP_TOTAL_COLUMNS] = profit_summary[TRIP_TOTAL_COLUMNS].round(2)
+    profit_summary['Units_Sold'] = profit_summary['Units_Sold'].astype(int)
 
     # Calculate Expected Profit
     profit_summary['Expected_Profit'] = profit_summary['Expected_Selling_Price'] - profit_summary['Gross_Cost']
+    profit_summary = profit_summary[['Trip #', 'Gross_Cost', 'Expected_Selling_Price', 'Number_of_Products',
+                                     'Expected_Profit', 'Realized_Revenue', 'Units_Sold']]
     
     # Print the summary
     print(profit_summary)
@@ -183,81 +1387,588 @@ def calculate_expected_profit():
 
 # Function to calculate net profit based on sales period
 def calculate_net_profit(start_date, end_date):
-    sold_df = pd.read_csv(SOLD_FILE)
-    sold_df['Selling Date'] = pd.to_datetime(sold_df['Selling Date'])
-
-    filtered_sales = sold_df[(sold_df['Selling Date'] >= start_date) & (sold_df['Selling Date'] <= end_date)]
+    filtered_sales = repo.sales_between(start_date, end_date)
     
-    total_cost = sum(filtered_sales['Cost (USD)'])
-    total_revenue = sum(filtered_sales['Final Price'])
+    total_cost = filtered_sales['Cost (USD)'].sum()
+    total_revenue = filtered_sales['Final Price'].sum()
     net_profit = total_revenue - total_cost
     number_of_products = len(filtered_sales)
 
     print(f"Net Profit: {net_profit}, Number of Products Sold: {number_of_products}")
 
-def sort_sizes(sizes):
-    """Sort sizes: numerical sizes first, then XS, S, M, L, XL, and Único."""
-    size_order = ['XS', 'S', 'M', 'L', 'XL', 'Único']
-    
-    # Split numeric and letter sizes
-    numeric_sizes = sorted([s for s in sizes if s.isdigit()], key=int)
-    letter_sizes = sorted([s for s in sizes if s in size_order], key=size_order.index)
-    
-    # Add "Único" to the list if present
-    unique_size = [s for s in sizes if s == 'Único']
-    
-    return numeric_sizes + letter_sizes + unique_size
+# Order of the product types in the catalog
+CATALOG_TYPE_ORDER = ['S', 'J', 'H', 'T', 'O']
+
+# Size registry: letter sizes in order, labels meaning "one size", and US men's -> EU shoe sizes
+LETTER_SIZE_ORDER = ['XXS', 'XS', 'S', 'M', 'L', 'XL', 'XXL', 'XXXL']
+ONE_SIZE_LABELS = {'': 'Único', 'UNICO': 'Único', 'ÚNICO': 'Único', 'NS': 'NS', 'OS': 'OS'}
+US_TO_EU_SHOE_SIZES = {
+    '3.5': '35.5', '4': '36', '4.5': '36.5', '5': '37.5', '5.5': '38', '6': '38.5', '6.5': '39',
+    '7': '40', '7.5': '40.5', '8': '41', '8.5': '42', '9': '42.5', '9.5': '43', '10': '44',
+    '10.5': '44.5', '11': '45', '11.5': '45.5', '12': '46', '12.5': '47', '13': '47.5',
+    '14': '48.5', '15': '49.5',
+}
+EU_TO_US_SHOE_SIZES = {eu: us for us, eu in US_TO_EU_SHOE_SIZES.items()}
+# Numbers below this are US men's shoe sizes; every number is ranked on the EU scale
+EU_SHOE_SIZE_MIN = 35
+
+# Group of each kind of size on a card: numbers first, then letters, then anything else, then one-size labels
+SIZE_GROUPS = {'number': 0, 'letter': 1, 'other': 2, 'one size': 3}
+
+# Raw size string -> registry entry, filled the first time a size is seen
+size_registry = {}
+
+# Function to describe one raw size: normalized label, sort group and rank, and US/EU equivalents
+def register_size(raw_size):
+    text = '' if pd.isna(raw_size) else str(raw_size).strip()
+    upper = text.upper()
+    entry = {'Label': text, 'Group': SIZE_GROUPS['other'], 'Rank': 0.0, 'US': None, 'EU': None}
+
+    if upper in ONE_SIZE_LABELS:
+        entry.update(Label=ONE_SIZE_LABELS[upper], Group=SIZE_GROUPS['one size'])
+    elif upper in LETTER_SIZE_ORDER:
+        entry.update(Label=upper, Group=SIZE_GROUPS['letter'], Rank=float(LETTER_SIZE_ORDER.index(upper)))
+    else:
+        try:
+            value = float(text.replace(',', '.'))
+        except ValueError:
+            return entry
+        if not math.isfinite(value):
+            return entry  # 'nan', 'inf', ... are labels, not sizes
+        label = f"{value:g}"  # '38,5' -> '38.5', '9.0' -> '9'
+        if value < EU_SHOE_SIZE_MIN:
+            entry.update(Label=label, Group=SIZE_GROUPS['number'], Rank=us_to_eu_size(value),
+                         US=label, EU=US_TO_EU_SHOE_SIZES.get(label))
+        else:
+            entry.update(Label=label, Group=SIZE_GROUPS['number'], Rank=value,
+                         US=EU_TO_US_SHOE_SIZES.get(label), EU=label)
+    return entry
+
+# Function to look up the registry entries of many raw sizes at once (one row per raw size)
+def size_table(raw_sizes):
+    """
+    Return a DataFrame indexed by raw size with Label, Group, Rank, US and EU columns. Only sizes
+    never seen before go through register_size, so sorting or converting the sizes of the whole
+    catalog is a join against a handful of registry rows.
+    """
+    raw_sizes = pd.unique(pd.Series(raw_sizes, dtype='object').fillna(''))
+    for raw_size in raw_sizes:
+        if raw_size not in size_registry:
+            size_registry[raw_size] = register_size(raw_size)
+    return pd.DataFrame.from_dict({raw_size: size_registry[raw_size] for raw_size in raw_sizes}, orient='index',
+                                  columns=['Label', 'Group', 'Rank', 'US', 'EU'])
+
+# Function to put a US men's shoe size on the EU scale: the chart, interpolated between its sizes
+# and extended past its ends by one EU size per US size (so 16 ranks after 15 and 3 before 3.5)
+def us_to_eu_size(us_size):
+    points = [(float(us), float(eu)) for us, eu in US_TO_EU_SHOE_SIZES.items()]  # In increasing order
+    if us_size <= points[0][0]:
+        return points[0][1] - (points[0][0] - us_size)
+    if us_size >= points[-1][0]:
+        return points[-1][1] + (us_size - points[-1][0])
+    for (us_low, eu_low), (us_high, eu_high) in zip(points, points[1:]):
+        if us_size <= us_high:
+            return eu_low + (eu_high - eu_low) * (us_size - us_low) / (us_high - us_low)
+
+
+# Function to turn the available rows into one catalog record per product (vectorized)
+def build_catalog(df):
+    """
+    Return one row per product ID, ordered by type (S, J, H, T, O, then the rest), with the
+    attributes of its first row and a 'Sizes' list of registry labels in canonical order (see
+    size_table): numeric sizes, then XXS..XXXL, then any other label, then 'Único'/'NS'. 'Photos' lists the product's photos from the
+    image index and 'Image' is the main one (None when there is no photo).
+    """
+    type_rank = df['Type'].astype(str).map({t: i for i, t in enumerate(CATALOG_TYPE_ORDER)}).fillna(len(CATALOG_TYPE_ORDER))
+    df = df.assign(type_rank=type_rank.values).sort_values('type_rank', kind='stable')
+
+    # One row per (product, size), labelled and ranked through the size registry; empty size fields become 'Único'
+    sizes = df['Sizes'].astype('string').fillna('').str.split(',')
+    sizes = df[['ID']].assign(Raw=sizes.values).explode('Raw')
+    sizes['Raw'] = sizes['Raw'].fillna('').str.strip()
+    sizes = sizes.join(size_table(sizes['Raw']), on='Raw').drop_duplicates(['ID', 'Label'])
+    sizes = sizes.sort_values(['Group', 'Rank', 'Label'], kind='stable')
+    size_lists = sizes.groupby('ID', sort=False)['Label'].agg(list)
+
+    catalog = df.drop_duplicates('ID')[['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Expected Price (USD)']].reset_index(drop=True)
+    catalog['Type'] = catalog['Type'].astype(str)
+    catalog['Sizes'] = catalog['ID'].map(size_lists)
+    photos = product_photos(catalog['ID'])
+    catalog['Photos'] = [photos.get(product_id, []) for product_id in catalog['ID']]
+    # object dtype keeps a real None for products without a photo (a str column would turn it into NaN, which is truthy)
+    catalog['Image'] = pd.Series([paths[0] if paths else None for paths in catalog['Photos']], index=catalog.index, dtype=object)
+    return catalog
+
+
+# Pages written from one catalog aggregation. Every dict is one page: 'include_price' adds the
+# USD/ARS prices and 'where' keeps only the products whose columns match, e.g.
+# {'filename': 'jordan.html', 'include_price': True, 'where': {'Type': ['S']}}
+HTML_VARIANTS = [
+    {'filename': 'index.html', 'include_price': False},
+    {'filename': 'catalogue.html', 'include_price': True},
+]
+
+# Rendered product cards from the last build, per price mode; bump the version when render_card changes
+FRAGMENT_CACHE_FILE = 'html_fragments.json'
+FRAGMENT_CACHE_VERSION = 3
+
+# Folders holding product photos, best first (a photo found in several folders is taken from the first)
+IMAGE_FOLDERS = ['images', 'LR', 'Photos-001', 'IG']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+IMAGE_INDEX_FILE = 'image_index.json'
+
+# Resized copies of the product photos used by the cards (widths in px, for 1x and 2x screens)
+RESPONSIVE_IMAGES_DIR = os.path.join('images', 'sized')
+RESPONSIVE_MANIFEST = os.path.join(RESPONSIVE_IMAGES_DIR, 'manifest.json')
+IMAGE_WIDTHS = (320, 640, 960)
+IMAGE_SIZES = "(max-width: 500px) calc(100vw - 80px), (max-width: 768px) calc(50vw - 80px), 300px"
+
+# Stylesheet and script of the generated pages, written to ASSETS_DIR under content-hashed names
+ASSETS_DIR = 'assets'
+
+SITE_CSS = """body {
+    font-family: 'Roboto', sans-serif;
+    margin: 0;
+    padding: 0;
+    background-color: #f9f9f9;
+    color: #333;
+}
+
+header {
+    color: black;
+    padding: 20px;
+    text-align: center;
+}
+
+header h1 {
+    font-family: 'IM Fell DW Pica', serif;
+    font-size: 3.5em;
+    margin: 0;
+}
+
+header h2 {
+    font-family: 'IM Fell DW Pica', serif;
+    font-size: 1.5em;
+    margin: 20px 0;
+}
+
+.social-media-icons {
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    gap: 10px;
+}
+
+.social-media-icons img {
+    width: 30px;
+    height: auto;
+}
+
+.info-bar {
+    padding: 10px;
+    text-align: center;
+    margin-top: 10px;
+    font-size: 0.9em;
+    display: inline-block;
+    width: 50%;
+    border-top: 1px solid #333;
+    border-bottom: 1px solid #333;
+}
+
+.filter-menu {
+    text-align: center;
+    margin-bottom: 20px;
+}
+
+.filter-menu button {
+    padding: 5px 10px;
+    border: 1px solid black;
+    border-radius: 5px;
+    background-color: white;
+    color: black;
+    font-size: 1em;
+    margin: 5px;
+    cursor: pointer;
+    transition: background-color 0.2s;
+}
+
+.filter-menu button:hover {
+    background-color: #f0f0f0;
+}
+
+.product-container {
+    display: flex;
+    flex-wrap: wrap;
+    justify-content: space-around;
+    padding: 20px;
+}
+
+.product {
+    background-color: white;
+    border-radius: 8px;
+    box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+    margin: 20px;
+    padding: 20px;
+    width: calc(25% - 40px);
+    text-align: center;
+    transition: transform 0.2s;
+    display: none;  /* Initially hide all products */
+}
+
+.product.show {
+    display: block;  /* Only show filtered products */
+}
+
+.product:hover {
+    transform: scale(1.05);
+}
+
+.product[data-photos] img {
+    cursor: pointer;  /* Click for the next photo */
+}
+
+.search-bar {
+    text-align: center;
+    margin: 10px 20px 0;
+}
+
+.search-bar input {
+    width: 100%;
+    max-width: 400px;
+    padding: 10px;
+    font-size: 1em;
+    border: 1px solid #ccc;
+    border-radius: 5px;
+}
+
+.shard {
+    display: contents;  /* Cards streamed from the feed sit directly in the product grid */
+}
+
+.product img {
+    width: 100%;
+    height: auto;
+    max-width: 300px;
+    object-fit: cover;
+    object-position: center;
+    border-bottom: 2px solid black;
+    display: block;
+    margin: 0 auto;
+}
+
+.product h3 {
+    font-family: 'Roboto', sans-serif;
+    font-size: 1.2em;
+    margin: 15px 0;
+}
+
+.product p {
+    font-family: 'Roboto', sans-serif;
+    font-size: 1em;
+    margin: 5px 0;
+}
+
+.product-id {
+    font-size: 1em;
+    margin: 5px 0;
+    font-weight: bold;
+}
+
+.price {
+    font-size: 1.2em;
+    margin: 10px 0;
+    font-weight: bold;
+}
+
+.sizes-container {
+    display: flex;
+    justify-content: center;
+    gap: 5px;
+    margin-top: 10px;
+}
+
+.size {
+    padding: 5px 10px;
+    border: 1px solid black;
+    border-radius: 5px;
+    font-size: 1em;
+    background-color: white;
+    color: black;
+}
+
+footer {
+    background-color: #333;
+    color: white;
+    padding: 3px;
+    font-size: 0.8em;
+    text-align: center;
+    position: fixed;
+    width: 100%;
+    bottom: 0;
+}
+
+footer a {
+    color: white;
+    font-weight: bold;
+}
+
+@media (max-width: 768px) {
+    .product {
+        width: calc(50% - 40px);
+    }
+
+    .info-bar {
+        width: 90%;
+    }
 
-def sort_sizes(sizes):
-    order = {'XS': 0, 'S': 1, 'M': 2, 'L': 3, 'XL': 4}
-    return sorted(sizes, key=lambda x: (x == 'Único', x.isdigit(), order.get(x, float(x) if x.isdigit() else x)))
+    .product img {
+        max-width: 100%;
+    }
+}
 
+@media (max-width: 500px) {
+    .product {
+        width: calc(100% - 40px);
+    }
 
+    .info-bar {
+        width: 90%;
+    }
+}
+"""
+
+SITE_JS = f"const IMAGE_SIZES = '{IMAGE_SIZES}';\n\n" + """function openPopup() {
+    window.open('images/sizes.jpg', 'popup', 'width=600,height=600');
+}
+
+// Feed shards not drawn yet ({url, types, start, count}) and the filter currently applied
+let pendingShards = [];
+let currentType = 'all';
+
+// Product cards by position in the page, the search index once fetched, and the positions
+// matching the search box (null when it is empty)
+let cards = [];
+let searchIndex = null;
+let currentMatches = null;
+
+// Build one product card from a feed entry (same markup as the cards baked into the page)
+function renderCard(product) {
+    const card = document.createElement('div');
+    card.className = 'product ' + product.type;
+    if (product.photos) {
+        card.dataset.photos = JSON.stringify(product.photos);
+    }
 
+    const image = document.createElement('img');
+    image.alt = product.name;
+    image.loading = 'lazy';
+    if (product.srcset) {
+        // Resized photos: WebP where supported, JPEG otherwise
+        const picture = document.createElement('picture');
+        const source = document.createElement('source');
+        source.type = 'image/webp';
+        source.srcset = product.srcset.webp;
+        source.sizes = IMAGE_SIZES;
+        picture.appendChild(source);
+        image.src = product.srcset.src;
+        image.srcset = product.srcset.jpg;
+        image.sizes = IMAGE_SIZES;
+        picture.appendChild(image);
+        card.appendChild(picture);
+    } else if (product.image) {
+        image.src = product.image;
+        card.appendChild(image);
+    }
 
-def generate_html(df, filename='index.html', include_price=False):
-    # Create a DataFrame to hold unique products and their sizes
-    unique_products = {}
+    const title = document.createElement('h3');
+    title.textContent = product.name;
+    card.appendChild(title);
+
+    const code = document.createElement('p');
+    code.className = 'product-id';
+    code.textContent = 'Código: ' + product.id;
+    card.appendChild(code);
+
+    if (product.usd !== undefined) {
+        ['$' + product.usd + ' USD', '$' + product.ars.toLocaleString('en-US') + ' ARS'].forEach(text => {
+            const price = document.createElement('p');
+            price.className = 'price';
+            price.textContent = text;
+            card.appendChild(price);
+        });
+    }
 
-    # Sort the products based on the specified order: S, J, H, T, O
-    type_order = ['S', 'J', 'H', 'T', 'O']
-    
-    # Sort the dataframe by Type using a categorical type for the order
-    df['Type'] = pd.Categorical(df['Type'], categories=type_order, ordered=True)
-    df = df.sort_values('Type')  # Sort the DataFrame by Type
+    const sizes = document.createElement('div');
+    sizes.className = 'sizes-container';
+    product.sizes.forEach(size => {
+        const span = document.createElement('span');
+        span.className = 'size';
+        span.textContent = size;
+        sizes.appendChild(span);
+    });
+    card.appendChild(sizes);
+    return card;
+}
+
+// Fetch one shard and draw it into its placeholder, keeping the catalog order
+function loadShard(shard) {
+    pendingShards = pendingShards.filter(other => other !== shard);
+    return fetch(shard.url)
+        .then(response => response.json())
+        .then(products => {
+            products.forEach((product, offset) => {
+                cards[shard.start + offset] = shard.placeholder.appendChild(renderCard(product));
+            });
+            filterProducts(currentType);
+        })
+        .catch(error => console.error('Could not load ' + shard.url, error));
+}
 
-    for _, row in df.iterrows():
-        product_id = row['ID']
-        
-        # Process sizes, handle empty or malformed size fields
-        sizes = row['Sizes']
-        if pd.isna(sizes) or sizes.strip() == '':
-            sizes_list = ['Único']  # If no size is provided, default to 'Único'
-        else:
-            sizes_list = sizes.split(", ")
-        
-        # Sort the sizes correctly
-        sorted_sizes = sort_sizes(sizes_list)
-        
-        if product_id not in unique_products:
-            unique_products[product_id] = {
-                'Type': row['Type'],
-                'Brand': row['Brand'],
-                'Name': row['Name'],
-                'Color': row['Color'],
-                'Expected Price (USD)': row['Expected Price (USD)'],
-                'Sizes': sorted_sizes,  # Use sorted sizes
-                'Image': f"images/{product_id}.jpg"  # Path to the image
+// Draw the next shard while the end of the catalog is on screen
+function loadNextShard() {
+    if (pendingShards.length === 0) {
+        return;
+    }
+    loadShard(pendingShards[0]).then(() => {
+        const footer = document.querySelector('footer');
+        if (footer && footer.getBoundingClientRect().top < window.innerHeight) {
+            loadNextShard();
+        }
+    });
+}
+
+// Show the next photo of a product with several photos (the resized versions only exist for the main one)
+document.addEventListener('click', event => {
+    const card = event.target.closest('.product[data-photos]');
+    if (!card || event.target.tagName !== 'IMG') {
+        return;
+    }
+    const photos = JSON.parse(card.dataset.photos);
+    const next = (Number(card.dataset.photo || 0) + 1) % photos.length;
+    card.dataset.photo = next;
+    card.querySelectorAll('source').forEach(source => source.remove());
+    event.target.removeAttribute('srcset');
+    event.target.src = photos[next];
+});
+
+// JavaScript function to filter products by type (and by the search box, if it has text)
+function filterProducts(type) {
+    currentType = type;
+    cards.forEach((product, position) => {
+        const typeMatches = type === 'all' || product.classList.contains(type);
+        const searchMatches = currentMatches === null || currentMatches.has(position);
+        product.classList.toggle('show', typeMatches && searchMatches);
+    });
+
+    // A type filter needs every shard holding that type, not just the ones scrolled to
+    if (type !== 'all') {
+        pendingShards.filter(shard => shard.types.includes(type)).forEach(loadShard);
+    }
+}
+
+// Split text into search tokens the same way the build does (search_tokens)
+function normalizeText(text) {
+    return text.normalize('NFD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase().match(/[a-z0-9]+(?:\\.[0-9]+)?/g) || [];
+}
+
+// Fetch the page's search index once (token -> product positions)
+function loadSearchIndex() {
+    if (searchIndex === null) {
+        const url = document.querySelector('.product-container').dataset.search;
+        searchIndex = fetch(url).then(response => response.json());
+    }
+    return searchIndex;
+}
+
+// Show the products matching every word of the query: words match token prefixes, numbers (sizes) match exactly
+function searchProducts(query) {
+    const terms = normalizeText(query);
+    if (terms.length === 0) {
+        currentMatches = null;
+        filterProducts(currentType);
+        return;
+    }
+    loadSearchIndex().then(index => {
+        const tokens = Object.keys(index);
+        let matches = null;
+        terms.forEach(term => {
+            const found = new Set();
+            const exact = /^[0-9.]+$/.test(term);
+            tokens.forEach(token => {
+                if (token === term || (!exact && token.startsWith(term))) {
+                    index[token].forEach(position => found.add(position));
+                }
+            });
+            matches = matches === null ? found : new Set([...matches].filter(position => found.has(position)));
+        });
+        currentMatches = matches;
+
+        // Draw the shards holding matches that have not been scrolled to yet
+        pendingShards.filter(shard => [...matches].some(position => position >= shard.start && position < shard.start + shard.count))
+            .forEach(loadShard);
+        filterProducts(currentType);
+    });
+}
+
+// Automatically show the products baked into the page, then stream the rest while scrolling
+window.onload = function() {
+    const container = document.querySelector('.product-container');
+    cards = Array.from(container.querySelectorAll('.product'));
+    pendingShards = JSON.parse(container.dataset.shards || '[]');
+    pendingShards.forEach(shard => {
+        shard.placeholder = document.createElement('div');
+        shard.placeholder.className = 'shard';
+        container.appendChild(shard.placeholder);
+    });
+    filterProducts('all');
+
+    const footer = document.querySelector('footer');
+    if ('IntersectionObserver' in window && footer) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextShard();
             }
-        else:
-            additional_sizes = sort_sizes(sizes_list)
-            for size in additional_sizes:
-                if size not in unique_products[product_id]['Sizes']:
-                    unique_products[product_id]['Sizes'].append(size)
-    
-    # Start generating the HTML
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(f"""<html lang="en">
+        }, { rootMargin: '600px' }).observe(footer);
+    } else {
+        pendingShards.slice().forEach(loadShard);
+    }
+}
+"""
+
+# Function to write a file named after its content (e.g. feed/index.5be01c9a3f.json) and return its name
+def write_hashed_file(directory, stem, extension, content):
+    name = f"{stem}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]}.{extension}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):  # Same name, same content: nothing to write
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+    return name
+
+# Function to remove the hashed files of a stem that are no longer referenced
+def remove_stale_hashed_files(directory, stem, extension, keep):
+    for name in os.listdir(directory):
+        if name.startswith(f"{stem}.") and name.endswith(f".{extension}") and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+# Function to write the CSS/JS assets under names derived from their content (e.g. assets/site.3f2a9c1b7d.css)
+def write_site_assets():
+    """
+    Return {'css': path, 'js': path}. A changed stylesheet or script gets a new name, so the
+    pages can be cached by browsers and the CDN indefinitely; older builds of the same asset
+    are removed.
+    """
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    assets = {}
+    for kind, content in (('css', SITE_CSS), ('js', SITE_JS)):
+        name = write_hashed_file(ASSETS_DIR, 'site', kind, content)
+        remove_stale_hashed_files(ASSETS_DIR, 'site', kind, {name})
+        assets[kind] = f"{ASSETS_DIR}/{name}"
+    return assets
+
+# Function to build the head, header and filter menu shared by every page
+def html_header(assets):
+    return f"""<html lang="en">
         <head>
             <meta charset="UTF-8">
             <meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -271,217 +1982,8 @@ def generate_html(df, filename='index.html', include_price=False):
             <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
             <link href="https://fonts.googleapis.com/css2?family=IM+Fell+DW+Pica:ital@0;1&family=Roboto:ital,wght@0,100;0,300;0,400;0,500;0,700;0,900&display=swap" rel="stylesheet">
 
-            <style>
-                body {{
-                    font-family: 'Roboto', sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: #f9f9f9;
-                    color: #333;
-                }}
-
-                header {{
-                    color: black;
-                    padding: 20px;
-                    text-align: center;
-                }}
-
-                header h1 {{
-                    font-family: 'IM Fell DW Pica', serif;
-                    font-size: 3.5em;
-                    margin: 0;
-                }}
-
-                header h2 {{
-                    font-family: 'IM Fell DW Pica', serif;
-                    font-size: 1.5em;
-                    margin: 20px 0;
-                }}
-
-                .social-media-icons {{
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    gap: 10px;
-                }}
-
-                .social-media-icons img {{
-                    width: 30px;
-                    height: auto;
-                }}
-
-                .info-bar {{
-                    padding: 10px;
-                    text-align: center;
-                    margin-top: 10px;
-                    font-size: 0.9em;
-                    display: inline-block;
-                    width: 50%;
-                    border-top: 1px solid #333;
-                    border-bottom: 1px solid #333;
-                }}
-
-                .filter-menu {{
-                    text-align: center;
-                    margin-bottom: 20px;
-                }}
-
-                .filter-menu button {{
-                    padding: 5px 10px;
-                    border: 1px solid black;
-                    border-radius: 5px;
-                    background-color: white;
-                    color: black;
-                    font-size: 1em;
-                    margin: 5px;
-                    cursor: pointer;
-                    transition: background-color 0.2s;
-                }}
-
-                .filter-menu button:hover {{
-                    background-color: #f0f0f0;
-                }}
-
-                .product-container {{
-                    display: flex;
-                    flex-wrap: wrap;
-                    justify-content: space-around;
-                    padding: 20px;
-                }}
-
-                .product {{
-                    background-color: white;
-                    border-radius: 8px;
-                    box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-                    margin: 20px;
-                    padding: 20px;
-                    width: calc(25% - 40px);
-                    text-align: center;
-                    transition: transform 0.2s;
-                    display: none;  /* Initially hide all products */
-                }}
-
-                .product.show {{
-                    display: block;  /* Only show filtered products */
-                }}
-
-                .product:hover {{
-                    transform: scale(1.05);
-                }}
-
-                .product img {{
-                    width: 100%;
-                    height: auto;
-                    max-width: 300px;
-                    object-fit: cover;
-                    object-position: center;
-                    border-bottom: 2px solid black;
-                    display: block;
-                    margin: 0 auto;
-                }}
-
-                .product h3 {{
-                    font-family: 'Roboto', sans-serif;
-                    font-size: 1.2em;
-                    margin: 15px 0;
-                }}
-
-                .product p {{
-                    font-family: 'Roboto', sans-serif;
-                    font-size: 1em;
-                    margin: 5px 0;
-                }}
-
-                .product-id {{
-                    font-size: 1em;
-                    margin: 5px 0;
-                    font-weight: bold;
-                }}
-
-                .price {{
-                    font-size: 1.2em;
-                    margin: 10px 0;
-                    font-weight: bold;
-                }}
-
-                .sizes-container {{
-                    display: flex;
-                    justify-content: center;
-                    gap: 5px;
-                    margin-top: 10px;
-                }}
-
-                .size {{
-                    padding: 5px 10px;
-                    border: 1px solid black;
-                    border-radius: 5px;
-                    font-size: 1em;
-                    background-color: white;
-                    color: black;
-                }}
-
-                footer {{
-                    background-color: #333;
-                    color: white;
-                    padding: 3px;
-                    font-size: 0.8em;
-                    text-align: center;
-                    position: fixed;
-                    width: 100%;
-                    bottom: 0;
-                }}
-
-                footer a {{
-                    color: white;
-                    font-weight: bold;
-                }}
-
-                @media (max-width: 768px) {{
-                    .product {{
-                        width: calc(50% - 40px);
-                    }}
-
-                    .info-bar {{
-                        width: 90%;
-                    }}
-
-                    .product img {{
-                        max-width: 100%;
-                    }}
-                }}
-
-                @media (max-width: 500px) {{
-                    .product {{
-                        width: calc(100% - 40px);
-                    }}
-
-                    .info-bar {{
-                        width: 90%;
-                    }}
-                }}
-            </style>
-            <script>
-                function openPopup() {{
-                    window.open('images/sizes.jpg', 'popup', 'width=600,height=600');
-                }}
-
-                // JavaScript function to filter products by type
-                function filterProducts(type) {{
-                    const products = document.querySelectorAll('.product');
-                    products.forEach(product => {{
-                        if (product.classList.contains(type) || type === 'all') {{
-                            product.classList.add('show');
-                        }} else {{
-                            product.classList.remove('show');
-                        }}
-                    }});
-                }}
-
-                // Automatically show all products on page load
-                window.onload = function() {{
-                    filterProducts('all');
-                }}
-            </script>
+            <link rel="stylesheet" href="{assets['css']}">
+            <script src="{assets['js']}"></script>
         </head>
         <body>
 
@@ -504,23 +2006,211 @@ def generate_html(df, filename='index.html', include_price=False):
                 <button onclick="filterProducts('O')">Accesorios</button>
             </div>
 
-            <div class="product-container">
-        """)
+            <div class="search-bar">
+                <input type="search" placeholder="Buscar (ej. jordan 38)" oninput="searchProducts(this.value)" onfocus="loadSearchIndex()">
+            </div>
+        """
 
-        for product_id, details in unique_products.items():
-            sizes_html = ''.join([f"<span class='size'>{size}</span>" for size in details['Sizes']])
-            price_without_decimal = int(details['Expected Price (USD)'])
-            price_ars = price_without_decimal * 1100  # ARS price conversion
+HTML_FOOTER = """
+            </div>
+            <footer>
+                <p>Los talles de las zapatillas son de US Men.<br>  
+                    <a href="javascript:void(0)" onclick="openPopup()">Tabla de Conversiones</a>.</p>
+            </footer>
+        </body>
+        </html>
+        """
 
-            # Include price only if requested (catalogue mode)
-            price_html = f"""
+# Function to scan the photo folders, relisting only the ones whose mtime changed since the saved index
+def load_image_index():
+    """
+    Return {folder: {'mtime_ns': ..., 'files': {name: [mtime_ns, size]}}}, persisted in
+    image_index.json. Adding, removing or renaming a photo changes its folder's mtime, so an
+    unchanged folder costs one stat and is not listed again.
+    """
+    index = {}
+    if os.path.exists(IMAGE_INDEX_FILE):
+        try:
+            with open(IMAGE_INDEX_FILE, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}  # Rebuilt from a full scan below
+
+    changed = set(index) != {folder for folder in IMAGE_FOLDERS if os.path.isdir(folder)}
+    for folder in IMAGE_FOLDERS:
+        if not os.path.isdir(folder):
+            index.pop(folder, None)
+            continue
+        mtime_ns = os.stat(folder).st_mtime_ns
+        if folder in index and index[folder]['mtime_ns'] == mtime_ns:
+            continue
+        files = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        index[folder] = {'mtime_ns': mtime_ns, 'files': files}
+        changed = True
+
+    if changed:
+        with open(f"{IMAGE_INDEX_FILE}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(f"{IMAGE_INDEX_FILE}.tmp", IMAGE_INDEX_FILE)
+    return index
+
+# Function to map product IDs to their photos, main photo first (e.g. HM03 -> [images/HM03.jpg, images/HM03 - 2.jpg])
+def product_photos(product_ids):
+    """
+    Photo names are the full product ID, optionally followed by a separator and a suffix for
+    extra photos: 'HM03 - 2', 'HM03 -2', 'HM03_back'. A letter or digit right after the ID makes
+    it another ID ('HM031' is never a photo of HM03). The same photo kept in several folders
+    (or as ' - 2' and ' -2') is listed once.
+    """
+    product_ids = set(product_ids)
+    index = load_image_index()
+    photos = {}
+    seen = set()
+    for rank, folder in enumerate(IMAGE_FOLDERS):
+        for name in sorted(index.get(folder, {}).get('files', {})):
+            stem, extension = os.path.splitext(name)
+            match = re.match(r'^([A-Z]+\d+)(?=[^A-Za-z0-9]|$)(.*)$', stem)
+            if not match:
+                continue  # Banners, icons, ...
+            product_id, suffix = match.groups()
+            if product_id not in product_ids:
+                continue
+
+            key = (product_id, re.sub(r'\s*-\s*', '-', suffix.strip()), extension.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            is_extra = suffix != ''
+            is_jpeg = extension.lower() in ('.jpg', '.jpeg')
+            photos.setdefault(product_id, []).append((is_extra, not is_jpeg, rank, name, f"{folder}/{name}"))
+
+    return {product_id: [path for *_, path in sorted(items)] for product_id, items in photos.items()}
+
+# Function to hash a file's content
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to write the WebP and JPEG widths of one photo (runs in a worker process)
+def make_image_derivatives(source, digest):
+    stem = re.sub(r'[^\w-]', '', os.path.splitext(os.path.basename(source))[0])  # No spaces in srcset URLs
+    files = []
+    with PILImage.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for width in sorted({min(width, image.width) for width in IMAGE_WIDTHS}):
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), PILImage.LANCZOS)
+            for kind, options in (('webp', {'quality': 80, 'method': 4}),
+                                  ('jpg', {'quality': 82, 'optimize': True, 'progressive': True})):
+                path = os.path.join(RESPONSIVE_IMAGES_DIR, f"{stem}.{digest[:10]}.{width}.{kind}")
+                resized.save(path, 'WEBP' if kind == 'webp' else 'JPEG', **options)
+                files.append([width, kind, path.replace(os.sep, '/')])
+    return files
+
+# Function to build (or reuse) the resized photos of the given images
+def build_image_derivatives(image_paths):
+    """
+    Return {image path: {'webp': srcset, 'jpg': srcset, 'src': smallest JPEG}} for the photos that
+    exist. Derivatives are named after the source's content hash and tracked in
+    images/sized/manifest.json, so only new or changed photos are resized, in a process pool.
+    Without Pillow nothing is built and the cards keep the original photo.
+    """
+    if PILImage is None:
+        return {}
+    os.makedirs(RESPONSIVE_IMAGES_DIR, exist_ok=True)
+    manifest = {}
+    if os.path.exists(RESPONSIVE_MANIFEST):
+        with open(RESPONSIVE_MANIFEST, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    jobs = {}
+    for source in set(image_paths):
+        if not os.path.exists(source):
+            continue
+        stat = os.stat(source)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = manifest.get(source)
+        if entry and entry['signature'] == signature and all(os.path.exists(path) for _, _, path in entry['files']):
+            continue
+        digest = file_digest(source)
+        if entry and entry['digest'] == digest and all(os.path.exists(path) for _, _, path in entry['files']):
+            entry['signature'] = signature  # Touched but not changed
+            continue
+        jobs[source] = (digest, signature)
+
+    if jobs:
+        with ProcessPoolExecutor() as pool:
+            futures = {source: pool.submit(make_image_derivatives, source, digest) for source, (digest, _) in jobs.items()}
+            for source, future in futures.items():
+                try:
+                    files = future.result()
+                except Exception as error:
+                    print(f"Could not resize {source}: {error}")
+                    manifest.pop(source, None)
+                    continue
+                digest, signature = jobs[source]
+                manifest[source] = {'signature': signature, 'digest': digest, 'files': files}
+        print(f"Resized {len(jobs)} photo(s) into {RESPONSIVE_IMAGES_DIR}.")
+
+    # Drop photos that are gone and derivatives no photo points at any more
+    manifest = {source: entry for source, entry in manifest.items() if os.path.exists(source)}
+    referenced = {os.path.basename(path) for entry in manifest.values() for _, _, path in entry['files']}
+    for name in os.listdir(RESPONSIVE_IMAGES_DIR):
+        if name not in referenced and name != os.path.basename(RESPONSIVE_MANIFEST):
+            os.remove(os.path.join(RESPONSIVE_IMAGES_DIR, name))
+    with open(f"{RESPONSIVE_MANIFEST}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{RESPONSIVE_MANIFEST}.tmp", RESPONSIVE_MANIFEST)
+
+    variants = {}
+    for source, entry in manifest.items():
+        srcsets = {kind: ', '.join(f"{path} {width}w" for width, file_kind, path in entry['files'] if file_kind == kind)
+                   for kind in ('webp', 'jpg')}
+        srcsets['src'] = next(path for _, kind, path in entry['files'] if kind == 'jpg')
+        variants[source] = srcsets
+    return variants
+
+# Function to build the <img> (or <picture> with the resized photos) of a card
+def render_image(details):
+    if not details['Image']:
+        return ''  # No photo yet; better no image than a broken one
+    if not details.get('Srcset'):
+        return f"<img src='{quote(details['Image'])}' alt='{details['Name']}' loading='lazy'>"
+    srcset = details['Srcset']
+    return (f"<picture><source type='image/webp' srcset='{srcset['webp']}' sizes='{IMAGE_SIZES}'>"
+            f"<img src='{srcset['src']}' srcset='{srcset['jpg']}' sizes='{IMAGE_SIZES}' alt='{details['Name']}' loading='lazy'></picture>")
+
+# Pesos per dollar used for the ARS prices
+ARS_PER_USD = 1100
+
+# Function to render the card of one catalog record
+def render_card(details, include_price=False):
+    product_id = details['ID']
+    sizes_html = ''.join([f"<span class='size'>{size}</span>" for size in details['Sizes']])
+    # Products with several photos cycle through them when the photo is clicked
+    photos_attr = ''
+    if len(details['Photos']) > 1:
+        photos_attr = f' data-photos="{html.escape(json.dumps([quote(photo) for photo in details["Photos"]]))}"'
+    price_without_decimal = int(details['Expected Price (USD)'])
+    price_ars = price_without_decimal * ARS_PER_USD  # ARS price conversion
+
+    # Include price only if requested (catalogue mode)
+    price_html = f"""
                 <p class='price'>${price_without_decimal} USD</p>
                 <p class='price'>${price_ars:,} ARS</p>
             """ if include_price else ""
 
-            f.write(f"""
-                <div class="product {details['Type']}">  <!-- Add product type as a class for filtering -->
-                    <img src='{details['Image']}' alt='{details['Name']}'>
+    return f"""
+                <div class="product {details['Type']}"{photos_attr}>  <!-- Add product type as a class for filtering -->
+                    {render_image(details)}
                     <h3>{details['Name']}</h3>
                     <p class="product-id">Código: {product_id}</p>
                     {price_html}
@@ -528,61 +2218,202 @@ def generate_html(df, filename='index.html', include_price=False):
                         {sizes_html}
                     </div>
                 </div>
-            """)
-
-        f.write("""
-            </div>
-            <footer>
-                <p>Los talles de las zapatillas son de US Men.<br>  
-                    <a href="javascript:void(0)" onclick="openPopup()">Tabla de Conversiones</a>.</p>
-            </footer>
-        </body>
-        </html>
+            """
+
+# Products baked into each page for the first screen; the rest is streamed from JSON shards in FEED_DIR
+FEED_DIR = 'feed'
+FEED_SHARD_SIZE = 24
+
+# Function to turn a catalog record into the compact entry drawn by the client renderer (renderCard in SITE_JS)
+def feed_entry(details, include_price):
+    entry = {'id': details['ID'], 'type': details['Type'], 'name': details['Name'],
+             'image': quote(details['Image']) if details['Image'] else None, 'sizes': details['Sizes']}
+    if len(details['Photos']) > 1:
+        entry['photos'] = [quote(photo) for photo in details['Photos']]
+    if details.get('Srcset'):
+        entry['srcset'] = details['Srcset']
+    if include_price:
+        entry['usd'] = int(details['Expected Price (USD)'])
+        entry['ars'] = entry['usd'] * ARS_PER_USD
+    return entry
+
+# Function to write a page's products as content-hashed JSON shards (e.g. feed/index.5be01c9a3f.json)
+def write_feed_shards(stem, records, include_price, first_position=0):
+    """
+    Return the shard list embedded in the page as [{'url', 'types', 'start', 'count'}, ...], where
+    'start' is the position in the page of the shard's first product. Unchanged shards keep their
+    file and name; shards of the same page no longer referenced are removed.
+    """
+    os.makedirs(FEED_DIR, exist_ok=True)
+    shards = []
+    names = set()
+    for start in range(0, len(records), FEED_SHARD_SIZE):
+        chunk = records[start:start + FEED_SHARD_SIZE]
+        content = json.dumps([feed_entry(details, include_price) for details in chunk],
+                             ensure_ascii=False, separators=(',', ':'), default=json_default)
+        name = write_hashed_file(FEED_DIR, stem, 'json', content)
+        names.add(name)
+        shards.append({'url': f"{FEED_DIR}/{name}", 'types': sorted({details['Type'] for details in chunk}),
+                       'start': first_position + start, 'count': len(chunk)})
+
+    remove_stale_hashed_files(FEED_DIR, stem, 'json', names)
+    return shards
+
+# Function to split text into search tokens (lowercase, no accents; normalizeText in SITE_JS does the same)
+def search_tokens(text):
+    text = ''.join(char for char in unicodedata.normalize('NFD', str(text)) if unicodedata.category(char) != 'Mn')
+    return re.findall(r'[a-z0-9]+(?:\.[0-9]+)?', text.lower())
+
+# Function to write a page's inverted search index: token -> positions of the products in the page
+def write_search_index(stem, records):
+    index = {}
+    for position, details in enumerate(records):
+        text = ' '.join(str(value) for value in [details['ID'], details['Brand'], details['Name'], details['Color'], *details['Sizes']])
+        for token in sorted(set(search_tokens(text))):
+            index.setdefault(token, []).append(position)
+    content = json.dumps(index, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    name = write_hashed_file(FEED_DIR, f"{stem}-search", 'json', content)
+    remove_stale_hashed_files(FEED_DIR, f"{stem}-search", 'json', {name})
+    return f"{FEED_DIR}/{name}"
+
+# Function to key a card by everything it renders
+def card_key(details, include_price):
+    fields = [FRAGMENT_CACHE_VERSION, details['ID'], details['Type'], details['Name'],
+              details['Expected Price (USD)'], details['Sizes'], details['Photos'], details.get('Srcset'), include_price]
+    return hashlib.sha1(json.dumps(fields, default=json_default).encode('utf-8')).hexdigest()
+
+# Function to load the card fragments of the last build ({"True": {key: html}, "False": {...}})
+def load_fragment_cache():
+    if not os.path.exists(FRAGMENT_CACHE_FILE):
+        return {}
+    try:
+        with open(FRAGMENT_CACHE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}  # A broken cache only costs a full re-render
+
+# Function to save the card fragments (written to a temp file first, then swapped in)
+def save_fragment_cache(cache):
+    tmp_path = f"{FRAGMENT_CACHE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, FRAGMENT_CACHE_FILE)
+
+# Function to write every page variant from a single catalog aggregation
+def render_html_pages(df, variants=HTML_VARIANTS):
+    """
+    Aggregate the available rows once, then write each variant from the same records: the
+    first FEED_SHARD_SIZE cards are baked into the page and the rest go to JSON feed shards.
+    The header is built once and a baked card is only rendered when its key is missing from
+    the fragment cache, so a rebuild after one sale only renders the cards that changed.
+    Returns the photo paths the pages point at.
+    """
+    catalog = build_catalog(df)
+    records = catalog.to_dict('records')
+    srcsets = build_image_derivatives(catalog['Image'].dropna())
+    for details in records:
+        details['Srcset'] = srcsets.get(details['Image'])
+    header = html_header(write_site_assets())
+    cache = load_fragment_cache()
+    used = {}  # Fragments of this build, per price mode
+    rendered = reused = 0
+    changed = False
+
+    for variant in variants:
+        include_price = variant.get('include_price', False)
+        cached = cache.setdefault(str(include_price), {})
+        fragments = used.setdefault(str(include_price), {})
+
+        # Keep only the products matching every 'where' column
+        mask = pd.Series(True, index=catalog.index)
+        for column, values in variant.get('where', {}).items():
+            mask &= catalog[column].isin(values)
+        page_records = [details for details, keep in zip(records, mask) if keep]
+
+        # The first screen is baked into the page, everything after it goes to the feed
+        page_cards = []
+        for details in page_records[:FEED_SHARD_SIZE]:
+            key = card_key(details, include_price)
+            if key in fragments or key in cached:
+                reused += 1
+            else:
+                cached[key] = render_card(details, include_price)
+                rendered += 1
+            fragments[key] = cached[key]
+            page_cards.append(fragments[key])
+        stem = os.path.splitext(os.path.basename(variant['filename']))[0]
+        shards = write_feed_shards(stem, page_records[FEED_SHARD_SIZE:], include_price, FEED_SHARD_SIZE)
+        search_index = write_search_index(stem, page_records)
+
+        with open(variant['filename'], 'w', encoding='utf-8') as f:
+            f.write(header)
+            f.write(f"""
+            <div class="product-container" data-shards="{html.escape(json.dumps(shards))}" data-search="{search_index}">
         """)
+            f.writelines(page_cards)
+            f.write(HTML_FOOTER)
+        print(f"HTML file {variant['filename']} generated successfully.")
+
+    # Only the cards of this build are kept, so sold-out products drop out of the cache
+    for mode, fragments in used.items():
+        if len(fragments) != len(cache[mode]):
+            cache[mode] = fragments
+            changed = True
+    if rendered or changed:
+        save_fragment_cache(cache)
+    print(f"{rendered} product card(s) rendered, {reused} reused from cache.")
+    return sorted({photo for details in records for photo in details['Photos']})
 
-    print(f"HTML file {filename} generated successfully.")
+
+def generate_html(df, filename='index.html', include_price=False):
+    render_html_pages(df, [{'filename': filename, 'include_price': include_price}])
 
 
 # Function to create both internal and catalogue versions
 def create_html_files(df):
-    # Create the internal (without price) version
-    generate_html(df, filename='index.html', include_price=False)
-    
-    # Create the catalogue (with price) version
-    generate_html(df, filename='catalogue.html', include_price=True)
+    # index.html (without price) and catalogue.html (with price) from the same aggregation
+    return render_html_pages(df, HTML_VARIANTS)
 
 # Function to search available items
 def search_available_items():
-    df = pd.read_csv(AVAILABLE_FILE)
+    df = repo.available()
     search_term = input("Enter search term (leave blank for all items): ")
-    filtered_df = df[df['Name'].str.contains(search_term, case=False) | (search_term == '')]
-
-    print(filtered_df)
 
-    # Generate HTML for search results
-    html_content = "<html><body><h1>Search Results</h1><table border='1'>"
-    html_content += "<tr><th>ID</th><th>Name</th><th>Available Sizes</th><th>Price</th><th>Image</th></tr>"
+    # Index lookup instead of a regex scan; the term is taken literally and small typos still match
+    ranked_ids = repo.search_index().search(search_term)
+    rank = pd.Series(range(len(ranked_ids)), index=ranked_ids)
+    filtered_df = df[df['ID'].isin(rank.index)]
+    filtered_df = filtered_df.iloc[filtered_df['ID'].map(rank).argsort(kind='stable')]
 
-    for index, row in filtered_df.iterrows():
-        sizes = ", ".join(row['Sizes'])
-        image_path = f"{row['ID']}.jpg"
-        html_content += f"<tr><td>{row['ID']}</td><td>{row['Name']}</td><td>{sizes}</td><td>{row['Expected Price (USD)']}</td><td><img src='{image_path}' alt='{row['Name']}' width='100'/></td></tr>"
-
-    html_content += "</table></body></html>"
+    print(filtered_df)
+    write_search_results(filtered_df)
+    print("Search results HTML file created.")
 
-    with open('search_results.html', 'w') as f:
-        f.write(html_content)
+# Function to write the search results page, one row per product, straight to the file
+def write_search_results(filtered_df, filename='search_results.html'):
+    products = filtered_df.drop_duplicates('ID')
+    sizes = filtered_df.assign(Sizes=filtered_df['Sizes'].astype(str).str.strip()).groupby('ID', sort=False)['Sizes'].agg(', '.join)
+    photos = product_photos(products['ID'])
 
-    print("Search results HTML file created.")
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("<html><body><h1>Search Results</h1><table border='1'>")
+        f.write("<tr><th>ID</th><th>Name</th><th>Available Sizes</th><th>Price</th><th>Image</th></tr>")
+        for product_id, name, price in zip(products['ID'], products['Name'], products['Expected Price (USD)']):
+            image_html = ''
+            if photos.get(product_id):
+                image_html = f"<img src='{quote(photos[product_id][0])}' alt='{html.escape(str(name))}' width='100'/>"
+            f.write(f"<tr><td>{html.escape(str(product_id))}</td><td>{html.escape(str(name))}</td>"
+                    f"<td>{html.escape(sizes[product_id])}</td><td>{price}</td><td>{image_html}</td></tr>")
+        f.write("</table></body></html>")
 
 # Function to view sales records
 def view_sales_records():
-    sold_df = pd.read_csv(SOLD_FILE)
+    sold_df = repo.sold()
     print(sold_df)
 
 # Function to view available products
 def view_available_products():
-    df = pd.read_csv(AVAILABLE_FILE)  # Load from available.csv
+    df = repo.available()  # Load from available.csv (plus pending sales)
 
     # Ensure 'Sizes' column is treated as a string
     df['Sizes'] = df['Sizes'].astype(str)
@@ -616,16 +2447,15 @@ def view_available_products():
 
 # Function to modify a product
 def modify_product():
-    df = pd.read_csv(PRODUCTS_FILE)
-    
     product_id = input("Enter the product ID to modify: ")
     
-    if product_id not in df['ID'].values:
+    product_rows = repo.find('products', product_id)
+    if product_rows.empty:
         print("Product ID not found.")
         return
     
     # Display the current product details
-    current_product = df[df['ID'] == product_id].iloc[0]
+    current_product = product_rows.iloc[0]
     print(f"\nCurrent details for product {product_id}:")
     print(current_product)
     
@@ -640,54 +2470,30 @@ def modify_product():
     new_sizes = input(f"Enter new sizes ({current_product['Sizes']}): ") or current_product['Sizes']
     new_trip_number = input(f"Enter new trip number ({current_product['Trip #']}): ") or current_product['Trip #']
     
-    # Update the product in the DataFrame
-    df.loc[df['ID'] == product_id, ['Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Sizes', 'Trip #']] = \
-        [new_type, new_gender, new_brand, new_name, new_color, float(new_cost), float(new_price), new_sizes, new_trip_number]
-    
-    # Save the updated DataFrame
-    df.to_csv(PRODUCTS_FILE, index=False)
+    # Update the product master row and save it (the stock rows only hold ID, size and count)
+    repo.update_rows('products', product_id, ['Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Sizes', 'Trip #'],
+                     [new_type, new_gender, new_brand, new_name, new_color, float(new_cost), float(new_price), new_sizes, new_trip_number])
     print(f"Product {product_id} updated successfully.")
     
-    # Now update available.csv
-    available_df = pd.read_csv(AVAILABLE_FILE)
-    
-    # Remove the old entries for the product in available.csv
-    available_df = available_df[available_df['ID'] != product_id]
-    
-    # Add updated product sizes and counts back into available.csv
+    # The stock only changes when new sizes were entered
+    if new_sizes == current_product['Sizes']:
+        return
+
+    # Replace the stock rows for the product with the new sizes and counts
+    repo.delete_rows('stock', product_id)
     size_counts = {size.strip(): new_sizes.split(',').count(size.strip()) for size in new_sizes.split(',')}
-    
-    # Create a list of new rows to add
-    new_rows = []
-    for size, count in size_counts.items():
-        new_rows.append({
-            'ID': product_id,
-            'Type': new_type,
-            'Gender': new_gender,
-            'Brand': new_brand,
-            'Name': new_name,
-            'Color': new_color,
-            'Cost (USD)': float(new_cost),
-            'Expected Price (USD)': float(new_price),
-            'Trip #': new_trip_number,
-            'Sizes': size,
-            'Count': count
-        })
-    
-    # Concatenate the new rows to the available DataFrame
-    available_df = pd.concat([available_df, pd.DataFrame(new_rows)], ignore_index=True)
-    
-    # Save the updated available_df to available.csv
-    available_df.to_csv(AVAILABLE_FILE, index=False)
-    print(f"Product {product_id} updated in available.csv successfully.")
+    repo.insert_rows('stock', pd.DataFrame({
+        'ID': product_id,
+        'Sizes': list(size_counts.keys()),
+        'Count': list(size_counts.values()),
+    }))
+    print(f"Product {product_id} stock updated successfully.")
 
 # Function to delete a product
 def delete_product():
-    df = pd.read_csv(PRODUCTS_FILE)
-    
     product_id = input("Enter the product ID to delete: ")
     
-    if product_id not in df['ID'].values:
+    if repo.find('products', product_id).empty:
         print("Product ID not found.")
         return
     
@@ -697,30 +2503,26 @@ def delete_product():
         print("Deletion canceled.")
         return
     
-    # Remove the product from the DataFrame
-    df = df[df['ID'] != product_id]
-    df.to_csv(PRODUCTS_FILE, index=False)
+    # Remove the product from products.csv
+    repo.delete_rows('products', product_id)
     print(f"Product {product_id} deleted from products.csv.")
     
-    # Now remove the product from available.csv
-    available_df = pd.read_csv(AVAILABLE_FILE)
-    available_df = available_df[available_df['ID'] != product_id]
-    available_df.to_csv(AVAILABLE_FILE, index=False)
-    print(f"Product {product_id} deleted from available.csv.")
+    # Now remove the product's stock
+    repo.delete_rows('stock', product_id)
+    print(f"Product {product_id} deleted from {STOCK_FILE}.")
 
 # Function to modify a sale
 def modify_sale():
-    sold_df = pd.read_csv(SOLD_FILE)
-    
     product_id = input("Enter the product ID of the sale to modify: ")
     
     # Check if the product exists in sold.csv
-    if product_id not in sold_df['ID'].values:
+    sale_rows = repo.find('sold', product_id)
+    if sale_rows.empty:
         print("Product ID not found in sales records.")
         return
     
     # Display the current sale record
-    current_sale = sold_df[sold_df['ID'] == product_id].iloc[0]
+    current_sale = sale_rows.iloc[0]
     print(f"\nCurrent details for sale of product {product_id}:")
     print(current_sale)
     
@@ -731,74 +2533,367 @@ def modify_sale():
     new_customer = input(f"Enter new customer name ({current_sale['Customer']}): ") or current_sale['Customer']
     new_notes = input(f"Enter new notes ({current_sale['Notes']}): ") or current_sale['Notes']
     
-    # Update the sale in the DataFrame
-    sold_df.loc[sold_df['ID'] == product_id, ['Size Sold', 'Selling Date', 'Final Price', 'Customer', 'Notes']] = \
-        [new_size_sold, new_selling_date, float(new_final_price), new_customer, new_notes]
-    
-    # Save the updated DataFrame
-    sold_df.to_csv(SOLD_FILE, index=False)
+    # Update the sale and save it
+    repo.update_rows('sold', product_id, ['Size Sold', 'Selling Date', 'Final Price', 'Customer', 'Notes'],
+                     [new_size_sold, new_selling_date, float(new_final_price), new_customer, new_notes])
     print(f"Sale record for product {product_id} updated successfully.")
 
-# Function to push files to GitHub
-def git_push(repo_url, commit_message):
+# What each publish folder received last time: {folder: {relative path: {'signature': [mtime_ns, size], 'digest': sha256}}}
+PUBLISH_MANIFEST = 'publish_manifest.json'
+# The public and private publishes run at the same time; each only rewrites its own entry of the manifest
+publish_manifest_lock = threading.Lock()
+# Files only meaningful on this machine (caches rebuilt on demand, locks); never published
+RUNTIME_FILES = {PUBLISH_MANIFEST, FRAGMENT_CACHE_FILE, IMAGE_INDEX_FILE, TRIP_TOTALS_FILE, ID_COUNTERS_FILE,
+                 ID_COUNTERS_LOCK, JOURNAL_LOCK, COMPACT_MARKER}
+# Hardlink published files to their blob instead of copying them (same disk only; off = plain copies).
+# Off unless FILY_PUBLISH_HARDLINKS=1: a link shares the file with the publish folders, so editing a source in place edits them too
+PUBLISH_HARDLINKS = os.environ.get('FILY_PUBLISH_HARDLINKS', '0') == '1'
+# FILY_DEDUPE_PHOTOS=1 also turns duplicate photos in the photo folders into links of one blob (needs PUBLISH_HARDLINKS)
+DEDUPE_PHOTO_FOLDERS = os.environ.get('FILY_DEDUPE_PHOTOS', '0') == '1'
+# Content-addressed store: every distinct file content is kept once, as .blobs/<first 2 hex>/<sha256>
+BLOB_STORE = '.blobs'
+BLOB_INDEX = os.path.join(BLOB_STORE, 'index.json')
+# The publishes share the store (and its index); only one of them changes it at a time
+blob_store_lock = threading.Lock()
+blob_index = None
+
+# Function to list the files under a folder as {relative path: path}, skipping some directories
+def tree_files(root, skip_dirs=()):
+    skip_dirs = {os.path.normpath(path) for path in skip_dirs}
+    files = {}
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = [name for name in dirs if os.path.normpath(os.path.join(folder, name)) not in skip_dirs]
+        for name in names:
+            path = os.path.join(folder, name)
+            files[os.path.relpath(path, root).replace(os.sep, '/')] = path
+    return files
+
+# Function to read what every publish folder received last time
+def read_publish_manifest():
+    if not os.path.exists(PUBLISH_MANIFEST):
+        return {}
+    with open(PUBLISH_MANIFEST, encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to load the blob store index: {'blobs': {digest: [mtime_ns, size]}, 'files': {path: [mtime_ns, size, digest]}}
+def load_blob_index():
+    global blob_index
+    if blob_index is None:
+        blob_index = {'blobs': {}, 'files': {}}
+        if os.path.exists(BLOB_INDEX):
+            with open(BLOB_INDEX, encoding='utf-8') as f:
+                blob_index = json.load(f)
+    return blob_index
+
+# Function to save the blob store index
+def save_blob_index():
+    os.makedirs(BLOB_STORE, exist_ok=True)
+    with open(f"{BLOB_INDEX}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(load_blob_index(), f, indent=1, sort_keys=True)
+    os.replace(f"{BLOB_INDEX}.tmp", BLOB_INDEX)
+
+# Function to get the path of the blob holding some content
+def blob_path(digest):
+    return os.path.join(BLOB_STORE, digest[:2], digest)
+
+# Function to replace a path with a hardlink of a blob (a copy when the disk cannot link)
+def link_blob(blob, target):
+    temporary = f"{target}.blob-link"
+    if os.path.lexists(temporary):
+        os.remove(temporary)
+    try:
+        os.link(blob, temporary)
+    except OSError:
+        shutil.copy2(blob, temporary)
+    os.replace(temporary, target)
+
+# Function to make sure the store holds a file's content and return its blob (call with blob_store_lock held)
+def store_blob(source, digest, link_source=False):
+    """
+    link_source=True makes the source itself the blob (no bytes copied); only for files that
+    are going to be replaced by a link to the blob anyway. Otherwise the content is copied in
+    once, so rewriting the source later never changes the blob.
+
+    All the links of a blob are the same file: writing into one of them in place changes the
+    blob. Its stat then no longer matches the index, the content is hashed again, and a blob
+    that no longer matches its name is unlinked from the store (the paths still linked to it
+    keep their content) and stored again from the source.
     """
-    Executes git commands to push changes to the specified repository.
+    index = load_blob_index()
+    path = blob_path(digest)
+    if os.path.exists(path):
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        if index['blobs'].get(digest) == signature or file_digest(path) == digest:
+            index['blobs'][digest] = signature
+            return path
+        os.remove(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    if os.path.lexists(temporary):
+        os.remove(temporary)
+    try:
+        if not link_source:
+            raise OSError
+        os.link(source, temporary)
+    except OSError:
+        shutil.copy2(source, temporary)
+    os.replace(temporary, path)
+    stat = os.stat(path)
+    index['blobs'][digest] = [stat.st_mtime_ns, stat.st_size]
+    return path
+
+# Function to back the photo folders with the blob store, so identical photos take the disk space of one
+def dedupe_photo_folders():
     """
-    subprocess.run(['git', 'init'])
-    subprocess.run(['git', 'remote', 'remove', 'origin'], stderr=subprocess.DEVNULL)  # Remove existing remote if it exists
-    subprocess.run(['git', 'add', '.'])
-    subprocess.run(['git', 'commit', '-m', commit_message])
-    subprocess.run(['git', 'branch', '-M', 'main'])
-    subprocess.run(['git', 'remote', 'add', 'origin', repo_url])
-    subprocess.run(['git', 'push', '-u', 'origin', 'main', '--force'])
+    Every photo becomes a hardlink of the blob of its content; copies of the same photo in
+    images/, LR/, Photos-001/ and IG/ end up as one file on disk, and publishing them is
+    linking that file again. Photos whose mtime and size did not change are not hashed again.
+    """
+    linked = freed = 0
+    with blob_store_lock:
+        index = load_blob_index()
+        for folder in IMAGE_FOLDERS:
+            for path in tree_files(folder).values():
+                if not path.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                stat = os.stat(path)
+                known = index['files'].get(path)
+                if known and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+                    digest = known[2]
+                else:
+                    digest = file_digest(path)
+                blob = store_blob(path, digest, link_source=True)
+                if not os.path.samefile(blob, path):
+                    link_blob(blob, path)
+                    linked += 1
+                    if stat.st_nlink == 1:
+                        freed += stat.st_size
+                stat = os.stat(path)
+                index['files'][path] = [stat.st_mtime_ns, stat.st_size, digest]
+        index['files'] = {path: entry for path, entry in index['files'].items() if os.path.exists(path)}
+        save_blob_index()
+    if linked:
+        print(f"Photo folders: {linked} duplicate photo(s) now share a blob ({freed / 1024 ** 2:,.1f} MB freed).")
+
+# Function to drop the blobs that no folder links to any more
+def collect_blobs():
+    removed = 0
+    with blob_store_lock:
+        index = load_blob_index()
+        for digest in list(index['blobs']):
+            path = blob_path(digest)
+            if not os.path.exists(path) or os.stat(path).st_nlink == 1:
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+                del index['blobs'][digest]
+        save_blob_index()
+    return removed
+
+# Function to bring a publish folder up to date with {relative path: source path}, copying only what changed
+def sync_files(files, dest_root):
+    """
+    A file is linked from its blob (or copied) only when its content hash differs from what the
+    folder got last time; the hash is only computed when the source's mtime or size changed. Files an
+    earlier publish put in the folder that are no longer listed are removed; anything else in
+    the folder (its .git, files added by hand) is left alone.
+
+    Returns (listed paths, removed paths): the only paths the commit may stage.
+    """
+    previous = read_publish_manifest().get(dest_root, {})
+    current = {}
+    copied = copied_bytes = 0
+
+    for relative_path, source in files.items():
+        target = os.path.join(dest_root, relative_path)
+        stat = os.stat(source)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = previous.get(relative_path)
+        if entry and entry['signature'] == signature and os.path.exists(target):
+            current[relative_path] = entry
+            if PUBLISH_HARDLINKS and os.stat(target).st_nlink == 1:
+                # A copy from before the blob store: swap it for a link so it stops taking space of its own
+                with blob_store_lock:
+                    blob = store_blob(source, entry['digest'])
+                link_blob(blob, target)
+            continue
+        digest = file_digest(source)
+        current[relative_path] = {'signature': signature, 'digest': digest}
+        if entry and entry['digest'] == digest and os.path.exists(target):
+            continue  # Touched but not changed
+
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        if PUBLISH_HARDLINKS:
+            with blob_store_lock:
+                blob = store_blob(source, digest)
+            link_blob(blob, target)
+        else:
+            if os.path.lexists(target):
+                os.remove(target)
+            shutil.copy2(source, target)
+        copied += 1
+        copied_bytes += stat.st_size
+
+    removed = 0
+    removed_paths = sorted(previous.keys() - current.keys())
+    for relative_path in removed_paths:
+        target = os.path.join(dest_root, relative_path)
+        if os.path.exists(target):
+            os.remove(target)
+            removed += 1
+
+    with publish_manifest_lock:
+        manifest = read_publish_manifest()
+        manifest[dest_root] = current
+        with open(f"{PUBLISH_MANIFEST}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(f"{PUBLISH_MANIFEST}.tmp", PUBLISH_MANIFEST)
+    if PUBLISH_HARDLINKS:
+        with blob_store_lock:
+            save_blob_index()
+    print(f"{dest_root}: {copied} file(s) staged ({copied_bytes / 1024:,.1f} KB), {removed} removed, "
+          f"{len(files) - copied} unchanged.")
+    return sorted(current), removed_paths
+
+# Function to run one git command in a publish folder; a non-zero exit raises CalledProcessError
+def run_git(repo_folder, *args, input=None):
+    result = subprocess.run(['git', *args], cwd=repo_folder, input=input, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+# Function to stage exactly the given paths (names taken literally, read from stdin so any number fits)
+def stage_paths(repo_folder, command, paths):
+    if paths:
+        run_git(repo_folder, '--literal-pathspecs', *command, '--pathspec-from-file=-', '--pathspec-file-nul',
+                input='\0'.join(paths))
+
+# Function to make a publish folder a working tree of the repository (only the first time)
+def prepare_publish_workspace(repo_folder, repo_url):
+    """
+    The folder keeps its .git between publishes, so git only looks at files whose stat changed.
+    A new folder adopts the remote's history (if the branch exists) without touching the files,
+    so the first commit holds just the differences and the push needs no --force. Remote files
+    the folder does not have stay in the index; only git_push's paths are ever staged.
+    """
+    os.makedirs(repo_folder, exist_ok=True)
+    if not os.path.isdir(os.path.join(repo_folder, '.git')):
+        run_git(repo_folder, 'init')
+        run_git(repo_folder, 'symbolic-ref', 'HEAD', f'refs/heads/{PUBLISH_BRANCH}')
+
+    remotes = run_git(repo_folder, 'remote').split()
+    if 'origin' not in remotes:
+        run_git(repo_folder, 'remote', 'add', 'origin', repo_url)
+    elif run_git(repo_folder, 'remote', 'get-url', 'origin') != repo_url:
+        run_git(repo_folder, 'remote', 'set-url', 'origin', repo_url)
+
+    has_commits = subprocess.run(['git', 'rev-parse', '--verify', '--quiet', 'HEAD'], cwd=repo_folder,
+                                 capture_output=True).returncode == 0
+    if not has_commits and run_git(repo_folder, 'ls-remote', '--heads', 'origin', PUBLISH_BRANCH):
+        run_git(repo_folder, 'fetch', 'origin', PUBLISH_BRANCH)
+        run_git(repo_folder, 'reset', '--mixed', 'FETCH_HEAD')  # Index = remote tree, files untouched
+
+# Function to commit what changed in a publish folder and push it (normal push, no --force)
+def git_push(repo_folder, repo_url, commit_message, listed_paths, removed_paths):
+    """
+    Only the paths sync_files listed or removed are staged, so files of the remote that the sync
+    never knew about (e.g. right after adopting its history) are kept instead of being deleted.
+    Returns True when something was pushed and False when there was nothing to commit. Any git
+    step that fails raises subprocess.CalledProcessError (with git's stderr) instead of being ignored.
+    """
+    prepare_publish_workspace(repo_folder, repo_url)
+    stage_paths(repo_folder, ('add', '--all', '--force'), listed_paths)  # The listing decides, not the .gitignore it carries
+    stage_paths(repo_folder, ('rm', '--cached', '--quiet', '--ignore-unmatch'), removed_paths)
+    if not run_git(repo_folder, 'diff', '--cached', '--name-only'):  # Unstaged remote-only files do not count
+        print(f"{repo_folder}: nothing changed, nothing to push.")
+        return False
+    run_git(repo_folder, 'commit', '--quiet', '-m', commit_message)
+    run_git(repo_folder, 'push', '--quiet', 'origin', f'HEAD:refs/heads/{PUBLISH_BRANCH}')
+    print(f"{repo_folder}: pushed {run_git(repo_folder, 'rev-parse', '--short', 'HEAD')} to {repo_url}.")
+    return True
+
+# Function to list the public site: index.html, images, the CSS/JS assets and the price-less feed
+def public_publish_files(photos):
+    files = {f"images/{path}": source for path, source in tree_files('images').items()}
+    files['index.html'] = 'index.html'
+    files.update({f"{ASSETS_DIR}/{path}": source for path, source in tree_files(ASSETS_DIR).items()})
+    files.update({photo: photo for photo in photos if not photo.startswith('images/')})  # Photos only found in LR/, IG/ or Photos-001/
+    files.update({f"{FEED_DIR}/{path}": source for path, source in tree_files(FEED_DIR).items()
+                  if path.startswith('index')})  # The catalogue shards carry prices and stay private
+    return files
+
+# Function to list the private repository: everything except .git, the publish folders and this machine's caches and locks
+def private_publish_files():
+    files = tree_files('.', skip_dirs=('.git', 'fily_public', 'fily_private', BLOB_STORE, SALES_ARCHIVE_DIR,
+                                       '__pycache__'))
+    for name in list(files):
+        if name in RUNTIME_FILES or name.endswith('.tmp'):
+            del files[name]
+    return files
+
+# Function to stage and push one publish target, timing it and reporting (instead of raising) a failure
+def publish_target(repo_folder, repo_url, commit_message, list_files):
+    start = time.perf_counter()
+    try:
+        listed_paths, removed_paths = sync_files(list_files(), repo_folder)
+        pushed = git_push(repo_folder, repo_url, commit_message, listed_paths, removed_paths)
+        status = 'pushed' if pushed else 'up to date'
+    except subprocess.CalledProcessError as error:
+        status = f"failed: '{' '.join(error.cmd)}' exited with {error.returncode}: {error.stderr.strip()}"
+    except Exception as error:  # One target failing must not lose the other target's result
+        status = f"failed: {type(error).__name__}: {error}"
+    return {'status': status, 'seconds': time.perf_counter() - start}
 
 # Function to generate HTML files and push to GitHub
 def create_html_and_push(df):
+    # Identical photos in the photo folders become hardlinks of one blob before anything is published (opt-in)
+    if PUBLISH_HARDLINKS and DEDUPE_PHOTO_FOLDERS:
+        dedupe_photo_folders()
+
     # Create the public (index.html) and private (catalogue.html) versions
-    generate_html(df, filename='index.html', include_price=False)
-    generate_html(df, filename='catalogue.html', include_price=True)
-
-    # --- Push to the public repository (fily) ---
-    public_repo_folder = 'fily_public'
-    if not os.path.exists(public_repo_folder):
-        os.makedirs(public_repo_folder)
-    if not os.path.exists(os.path.join(public_repo_folder, 'images')):
-        os.makedirs(os.path.join(public_repo_folder, 'images'))
-
-    # Copy index.html and images to the public folder using shutil
-    shutil.copy('index.html', public_repo_folder)
-    shutil.copytree('images', os.path.join(public_repo_folder, 'images'), dirs_exist_ok=True)
-
-    # Change directory to the public repository folder and push
-    os.chdir(public_repo_folder)
-    git_push(GITHUB_PUBLIC_REPO, "Update public index.html")
-    os.chdir("..")  # Go back to the root directory
-
-    # --- Move catalogue.html to /docs and rename it to index.html ---
+    photos = create_html_files(df)
+
+    # --- Move catalogue.html to /docs and rename it to index.html (part of the private repository) ---
     docs_folder = 'docs'
     if not os.path.exists(docs_folder):
         os.makedirs(docs_folder)
 
-    # Rename and move catalogue.html to docs/index.html
+    # Rename and move catalogue.html to docs/index.html, with the assets and the catalogue feed next to it
     shutil.move('catalogue.html', os.path.join(docs_folder, 'index.html'))
-
-    # --- Push to the private repository (fily_private) ---
-    private_repo_folder = 'fily_private'
-    if not os.path.exists(private_repo_folder):
-        os.makedirs(private_repo_folder)
-
-    # Copy all files to the private folder, excluding .git folder, public files, and docs
-    shutil.copytree('.', private_repo_folder, dirs_exist_ok=True, ignore=shutil.ignore_patterns('.git', 'fily_public', 'fily_private', 'docs'))
-
-    # Copy the /docs folder into the private folder to upload it as well
-    shutil.copytree(docs_folder, os.path.join(private_repo_folder, 'docs'), dirs_exist_ok=True)
-
-    # Change directory to the private repository folder and push
-    os.chdir(private_repo_folder)
-    git_push(GITHUB_PRIVATE_REPO, "Update private docs and catalogue")
-    os.chdir("..")  # Go back to the root directory
-
-    print("HTML reports generated and pushed to GitHub successfully.")
+    docs_files = {f"{ASSETS_DIR}/{path}": source for path, source in tree_files(ASSETS_DIR).items()}
+    docs_files.update({f"{FEED_DIR}/{path}": source for path, source in tree_files(FEED_DIR).items()
+                       if path.startswith('catalogue')})
+    sync_files(docs_files, docs_folder)
+
+    # --- Stage and push the public (fily) and private (fily_private) repositories at the same time ---
+    targets = {
+        'fily': ('fily_public', GITHUB_PUBLIC_REPO, "Update public index.html", lambda: public_publish_files(photos)),
+        'fily_private': ('fily_private', GITHUB_PRIVATE_REPO, "Update private docs and catalogue", private_publish_files),
+    }
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = {name: pool.submit(publish_target, *target) for name, target in targets.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, result in results.items():
+        print(f"{name}: {result['status']} ({result['seconds']:.2f} s)")
+    if PUBLISH_HARDLINKS:
+        removed = collect_blobs()
+        if removed:
+            print(f"Removed {removed} blob(s) nothing links to any more.")
+    if all(not result['status'].startswith('failed') for result in results.values()):
+        print("HTML reports generated and pushed to GitHub successfully.")
+
+# Function to export the tables as CSV (products.csv, available.csv, sold.csv)
+def export_tables_csv():
+    if STORAGE_FORMAT == 'csv':
+        # products.csv and sold.csv are the storage itself; folding the journal in brings them up to date
+        repo.compact()
+    else:
+        repo.products().to_csv(PRODUCTS_FILE, index=False)
+        repo.sold().to_csv(SOLD_FILE, index=False)
+    # available.csv is the stock joined with the product attributes
+    repo.available().to_csv(AVAILABLE_FILE, index=False)
+    print(f"Exported {PRODUCTS_FILE}, {AVAILABLE_FILE} and {SOLD_FILE}.")
 
 # Main menu function
 def main_menu():
@@ -815,7 +2910,10 @@ def main_menu():
         print("9. Modify a Product")
         print("10. Delete a Product")
         print("11. Modify a Sale")
-        print("12. Exit")
+        print("12. Import Products from File")
+        print("13. Import Sales from File")
+        print("14. Export Data to CSV")
+        print("15. Exit")
 
         choice = input("Choose an option: ")
         
@@ -844,6 +2942,13 @@ def main_menu():
         elif choice == '11':
             modify_sale()
         elif choice == '12':
+            import_products(input("Enter manifest file (CSV or JSONL): "))
+        elif choice == '13':
+            import_sales(input("Enter sales file (CSV or JSONL): "))
+        elif choice == '14':
+            export_tables_csv()
+        elif choice == '15':
+            repo.compact()  # Leave clean snapshot files behind on exit
             break
         else:
             print("Invalid choice. Please try again.")
@@ -852,12 +2957,13 @@ def main_menu():
 
 # Run the main menu
 if __name__ == "__main__":
-    # Create empty CSV files if they do not exist
+    # Create empty CSV files if they do not exist (stock.csv is created from available.csv on first use)
     if not os.path.exists(PRODUCTS_FILE):
         pd.DataFrame(columns=['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Trip #', 'Sizes']).to_csv(PRODUCTS_FILE, index=False)
-    if not os.path.exists(AVAILABLE_FILE):
-        pd.DataFrame(columns=['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Trip #', 'Sizes', 'Count']).to_csv(AVAILABLE_FILE, index=False)
     if not os.path.exists(SOLD_FILE):
         pd.DataFrame(columns=['ID', 'Type', 'Gender', 'Brand', 'Name', 'Color', 'Cost (USD)', 'Expected Price (USD)', 'Trip #', 'Sizes', 'Selling Date', 'Final Price', 'Customer', 'Notes']).to_csv(SOLD_FILE, index=False)
 
+    # Finish a compaction that was interrupted by a crash
+    recover_journal()
+
     main_menu()
\ No newline at end of file